@@ -51,7 +51,13 @@ if os.path.exists(input_source_location):
             for dcm_file in dcm_files:
                 try:
                     print("Processing: " + dcm_file)
-                    ds = dcmread(dcm_file)
+                    # Only three tags are needed: skip the pixel data and
+                    # every other element
+                    ds = dcmread(
+                        dcm_file,
+                        stop_before_pixels=True,
+                        specific_tags=['StudyInstanceUID', 'SeriesInstanceUID', (0x2200, 0x0005)]
+                    )
                     study_instance_uid = ds.StudyInstanceUID
                     series_instance_uid = ds.SeriesInstanceUID
                     # Extract barcode value from custom tag [0x2200, 0x0005]
@@ -162,7 +162,8 @@ for index,row in df[from_row:to_row].iterrows():
         
         #Save metadata.
         metadata_file_name = study_instance_uid + '_' + str(file_counter) + ".txt"
-        get_dicom_dataset(dcm_file, metadata_folder, metadata_file_name)
+        # The dataset just saved is what the file now holds, so don't read it back
+        get_dicom_dataset(dcm_file, metadata_folder, metadata_file_name, ds=ds)
         file_counter = file_counter + 1
         # Small delay and garbage collection after each DICOM file
         time.sleep(1)
@@ -41,6 +41,14 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    """Safely read boolean environment variable (1/true/yes/on) with fallback."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 def _env_float(name: str, default: float) -> float:
     """Safely read float environment variable with fallback."""
     value = os.getenv(name)
@@ -90,6 +98,7 @@ class LoadProfileConfig:
     load_multiplier: float
     test_duration_seconds: int
     concurrency: int
+    reuse_associations: bool = True  # Each worker keeps one association open
 
     @classmethod
     def from_env(cls) -> "LoadProfileConfig":
@@ -98,6 +107,7 @@ class LoadProfileConfig:
             load_multiplier=_env_float("LOAD_MULTIPLIER", 3.0),
             test_duration_seconds=_env_int("TEST_DURATION_SECONDS", 300),
             concurrency=_env_int("LOAD_CONCURRENCY", 8),
+            reuse_associations=_env_bool("LOAD_REUSE_ASSOCIATIONS", True),
         )
 
 
@@ -16,6 +16,7 @@ the original script remains useful for detailed metadata cataloging and analysis
 
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from typing import Iterable, List
 
@@ -59,20 +60,36 @@ def find_dicom_files(root: Path, recursive: bool = True) -> List[Path]:
     if not root.exists():
         raise FileNotFoundError(f"DICOM root directory does not exist: {root}")
 
-    pattern = "**/*" if recursive else "*"
+    # Walk with os.scandir: each entry's type comes from the directory
+    # listing, so only the DICOM check itself touches the files. Like
+    # Path.glob("**/*"), symlinked directories are not descended into.
     files: List[Path] = []
-    for path in root.glob(pattern):
-        if not path.is_file():
+    pending = [root]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            # Skip directories that can't be listed
             continue
 
-        if path.name.startswith("."):
-            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    pending.append(Path(entry.path))
+                continue
 
-        # Validate that the file is actually a DICOM file
-        if not is_dicom_file(path):
-            continue
+            if not entry.is_file():
+                continue
+
+            if entry.name.startswith("."):
+                continue
+
+            # Validate that the file is actually a DICOM file
+            path = Path(entry.path)
+            if not is_dicom_file(path):
+                continue
 
-        files.append(path)
+            files.append(path)
 
     if not files:
         raise RuntimeError(f"No DICOM files found under: {root}")
@@ -8,7 +8,7 @@ import time
 import glob
 import json
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 from pydicom import dcmread
 from pydicom import datadict
 
@@ -38,33 +38,55 @@ def get_dcm_files(directory: str) -> List[str]:
         pass
     
     # Fallback to non-recursive search (also handles subdirectories manually)
-    dcm_files = []
     if not os.path.exists(directory):
-        return dcm_files
+        return []
     
-    def search_recursive(dir_path: str) -> List[str]:
-        """Recursively search for DICOM files."""
-        found_files = []
+    return sorted(iter_dcm_files(directory))
+
+
+def iter_dcm_files(directory: str) -> Iterator[str]:
+    """
+    Yield DICOM files in a directory (recursive) as they are found.
+    
+    Unlike get_dcm_files, the paths are not sorted, so callers can start
+    working on the first files before the whole tree has been searched.
+    
+    Args:
+        directory: Path to directory containing DICOM files
+        
+    Yields:
+        Full paths to DICOM files (.dcm or .dicom extension)
+    """
+    # Walk the tree with an explicit stack of directories instead of
+    # recursion, so deeply nested folders can't hit the recursion limit.
+    # Directories are tracked by real path, so one reached again through a
+    # symlink (or a symlink loop) is only searched once.
+    pending = [os.path.normpath(directory)]
+    visited = set()
+    while pending:
+        dir_path = pending.pop()
+        real_path = os.path.realpath(dir_path)
+        if real_path in visited:
+            continue
+        visited.add(real_path)
         try:
-            for item in os.listdir(dir_path):
-                item_path = os.path.join(dir_path, item)
-                if os.path.isfile(item_path):
-                    # Check for common DICOM extensions
-                    if item.lower().endswith(('.dcm', '.dicom')):
-                        found_files.append(item_path)
-                elif os.path.isdir(item_path):
-                    # Recursively search subdirectories
-                    found_files.extend(search_recursive(item_path))
+            # scandir entries carry the file type from the directory
+            # listing, so most entries need no extra stat call
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        # Check for common DICOM extensions
+                        if entry.name.lower().endswith(('.dcm', '.dicom')):
+                            yield entry.path
+                    elif entry.is_dir():
+                        # Search subdirectories later
+                        pending.append(entry.path)
         except PermissionError:
             # Skip directories we don't have permission to access
             pass
         except Exception:
             # Skip other errors and continue
             pass
-        return found_files
-    
-    dcm_files = search_recursive(directory)
-    return sorted(dcm_files)
 
 
 def generate_unique_id() -> str:
@@ -80,6 +102,40 @@ def generate_unique_id() -> str:
     return unique_id
 
 
+# Keywords update_tags_ds sets directly (adding the tag if it's missing)
+_UPDATABLE_KEYWORDS = frozenset({
+    "SpecimenLabelInImage",
+    "BurnedInAnnotation",
+    "StudyInstanceUID",
+    "SeriesInstanceUID",
+    "DimensionOrganizationType",
+    "SOPClassUID",
+    "SOPInstanceUID",
+    "BarcodeValue",
+    "NumberOfFrames",
+    "AccessionNumber",
+    "ContainerIdentifier",
+    "FrameOfReferenceUID",
+    "PatientID",
+    "PatientName",
+    "PatientBirthDate",
+    "InstitutionName",
+    "ReferringPhysicianName",
+    "DeviceSerialNumber",
+})
+
+# Tags update_tags_ds only updates when already present, by hex name. The
+# tags are plain ints, so looking them up needs no tuple-to-Tag conversion.
+_UPDATABLE_EXISTING_TAGS = {
+    "30210010": 0x30210010,
+    "30211001": 0x30211001,
+    "30211003": 0x30211003,
+    "30211004": 0x30211004,
+    "00020002": 0x00020002,
+    "00100040": 0x00100040,
+}
+
+
 def update_tags_ds(ds, tag_name: str, value):
     """
     Update a DICOM tag in a dataset.
@@ -89,64 +145,13 @@ def update_tags_ds(ds, tag_name: str, value):
         tag_name: Name of the tag to update (e.g., "StudyInstanceUID")
         value: Value to set for the tag
     """
-    if tag_name == "SpecimenLabelInImage":
-        ds.SpecimenLabelInImage = value
-    if tag_name == "BurnedInAnnotation":
-        ds.BurnedInAnnotation = value
-    if tag_name == "StudyInstanceUID":
-        ds.StudyInstanceUID = value
-    if tag_name == "SeriesInstanceUID":
-        ds.SeriesInstanceUID = value
-    if tag_name == "DimensionOrganizationType":
-        ds.DimensionOrganizationType = value
-    if tag_name == "SOPClassUID":
-        ds.SOPClassUID = value
-    if tag_name == "SOPInstanceUID":
-        ds.SOPInstanceUID = value
-    if tag_name == "BarcodeValue":
-        ds.BarcodeValue = value
-    if tag_name == "NumberOfFrames":
-        ds.NumberOfFrames = value
-    if tag_name == "AccessionNumber":
-        ds.AccessionNumber = value
-    if tag_name == "ContainerIdentifier":
-        ds.ContainerIdentifier = value
-    if tag_name == "StudyInstanceUID":
-        ds.StudyInstanceUID = value
-    if tag_name == "FrameOfReferenceUID":
-        ds.FrameOfReferenceUID = value
-    if tag_name == "PatientID":
-        ds.PatientID = value
-    if tag_name == "PatientName":
-        ds.PatientName = value
-    if tag_name == "PatientBirthDate":
-        ds.PatientBirthDate = value
-    if tag_name == "InstitutionName":
-        ds.InstitutionName = value
-    if tag_name == "ReferringPhysicianName":
-        ds.ReferringPhysicianName = value
-    if tag_name == "DeviceSerialNumber":
-        ds.DeviceSerialNumber = value
-    
-    # Handle private tags
-    if tag_name == "30210010":
-        if (0x3021, 0x0010) in ds:
-            ds[0x3021, 0x0010].value = value
-    if tag_name == "30211001":
-        if (0x3021, 0x1001) in ds:
-            ds[0x3021, 0x1001].value = value
-    if tag_name == "30211003":
-        if (0x3021, 0x1003) in ds:
-            ds[0x3021, 0x1003].value = value
-    if tag_name == "30211004":
-        if (0x3021, 0x1004) in ds:
-            ds[0x3021, 0x1004].value = value
-    if tag_name == "00020002":
-        if (0x0002, 0x0002) in ds:
-            ds[0x0002, 0x0002].value = value
-    if tag_name == "00100040":
-        if (0x0010, 0x0040) in ds:
-            ds[0x0010, 0x0040].value = value
+    if tag_name in _UPDATABLE_KEYWORDS:
+        setattr(ds, tag_name, value)
+    elif tag_name in _UPDATABLE_EXISTING_TAGS:
+        # Handle private tags
+        tag = _UPDATABLE_EXISTING_TAGS[tag_name]
+        if tag in ds._dict:
+            ds[tag].value = value
     
     return ds
 
@@ -217,8 +222,9 @@ def get_tag_value(dcm_file, tag_name):
     Returns:
         Tag value or None
     """
-    ds = dcmread(dcm_file)
     if tag_name == "StudyInstanceUID":
+        # Only the one element is needed, so don't parse the rest of the file
+        ds = dcmread(dcm_file, stop_before_pixels=True, specific_tags=[(0x0020, 0x000d)])
         return ds[0x0020, 0x000d].value
     return None
 
@@ -237,6 +243,17 @@ def update_tags_all_files(dir, tag_name, value):
         update_tags(dcm_file, tag_name, value)
 
 
+def _already_set(dcm_file, keyword, value) -> bool:
+    """
+    Check whether a file already has a value, reading only that element.
+    
+    Lets the update functions below skip re-writing files that a previous
+    run already updated.
+    """
+    ds = dcmread(dcm_file, stop_before_pixels=True, specific_tags=[keyword])
+    return keyword in ds and ds[keyword].value == value
+
+
 def update_bar_code_file(dcm_file, new_bar_code):
     """
     Update the barcode value in a DICOM file.
@@ -245,6 +262,8 @@ def update_bar_code_file(dcm_file, new_bar_code):
         dcm_file: Path to DICOM file
         new_bar_code: New barcode value
     """
+    if _already_set(dcm_file, "BarcodeValue", new_bar_code):
+        return
     ds = dcmread(dcm_file)
     ds.BarcodeValue = new_bar_code
     ds.save_as(dcm_file)
@@ -271,6 +290,8 @@ def update_image_type_file(dcm_file, new_image_type):
         dcm_file: Path to DICOM file
         new_image_type: New ImageType value (e.g., ['DERIVED', 'PRIMARY', 'VOLUME', 'RESAMPLED'])
     """
+    if _already_set(dcm_file, "ImageType", new_image_type):
+        return
     ds = dcmread(dcm_file)
     ds.ImageType = new_image_type
     ds.save_as(dcm_file)
@@ -284,6 +305,8 @@ def update_dim_org_type(dcm_file, new_dim_org_type):
         dcm_file: Path to DICOM file
         new_dim_org_type: New DimensionOrganizationType value
     """
+    if _already_set(dcm_file, "DimensionOrganizationType", new_dim_org_type):
+        return
     ds = dcmread(dcm_file)
     ds.DimensionOrganizationType = new_dim_org_type
     ds.save_as(dcm_file)
@@ -304,7 +327,11 @@ def is_valid_tag(keyword):
     return True
 
 
-def get_dicom_dataset(dcm_file: str, metadata_folder: str, metadata_file_name: str):
+# Default for ds.get() that can't be confused with a stored value
+_MISSING = object()
+
+
+def get_dicom_dataset(dcm_file: str, metadata_folder: str, metadata_file_name: str, ds=None):
     """
     Extract DICOM metadata and save to a text file.
     
@@ -312,9 +339,12 @@ def get_dicom_dataset(dcm_file: str, metadata_folder: str, metadata_file_name: s
         dcm_file: Path to DICOM file
         metadata_folder: Directory to save metadata file
         metadata_file_name: Name of the metadata file to create
+        ds: Optional pydicom Dataset already loaded for dcm_file (e.g. one
+            that was just saved), to avoid reading the file again
     """
     try:
-        ds = dcmread(dcm_file)
+        if ds is None:
+            ds = dcmread(dcm_file)
         
         # Create metadata folder if it doesn't exist
         os.makedirs(metadata_folder, exist_ok=True)
@@ -334,9 +364,11 @@ def get_dicom_dataset(dcm_file: str, metadata_folder: str, metadata_file_name: s
                 "DeviceSerialNumber"
             ]
             
+            # One lookup per tag: ds.get() returns the default for a
+            # missing tag instead of needing a hasattr() check first
             for tag_name in key_tags:
-                if hasattr(ds, tag_name):
-                    value = getattr(ds, tag_name)
+                value = ds.get(tag_name, _MISSING)
+                if value is not _MISSING:
                     f.write(f"{tag_name}: {value}\n")
             
             # Write all tags
@@ -402,11 +434,18 @@ def ds_to_dict(ds):
         Dictionary representation of the DICOM dataset
     """
     out = {}
-    for elem in ds:
-        if elem.VR == "SQ":
-            out[elem.name] = [ds_to_dict(item) for item in elem.value]
-        else:
-            out[elem.name] = str(elem.value)
+    # Nested sequence items are converted from an explicit stack rather than
+    # by recursion, so deep nesting can't hit the recursion limit. Each
+    # item's dict is created in place and filled when the item is visited.
+    pending = [(ds, out)]
+    while pending:
+        dataset, target = pending.pop()
+        for elem in dataset:
+            if elem.VR == "SQ":
+                items = target[elem.name] = [{} for _ in elem.value]
+                pending.extend(zip(elem.value, items))
+            else:
+                target[elem.name] = str(elem.value)
     return out
 
 
@@ -467,19 +506,23 @@ def get_not_deidentified_list(deid_tags, dcm_file, dest_folder):
     Returns:
         List of tags that are not de-identified
     """
-    ds = dcmread(dcm_file)
+    # Only the checked tags are parsed; everything else (including the
+    # pixel data) is skipped over while reading
+    ds = dcmread(dcm_file, specific_tags=list(deid_tags))
     not_deidentified_list = []
     deidentified_list = []
     not_existing_keys = []
     
     for deidtag in deid_tags:
         try:
-            if not ds[deidtag].value or ds[deidtag].value == '':
-                deidentified_list.append(f"{deidtag}:{str(ds[deidtag].value)}")
-            else:
-                not_deidentified_list.append(f"{deidtag}:{str(ds[deidtag].value)}")
+            value = ds[deidtag].value
         except KeyError:
             not_existing_keys.append(deidtag)
+            continue
+        if not value:
+            deidentified_list.append(f"{deidtag}:{str(value)}")
+        else:
+            not_deidentified_list.append(f"{deidtag}:{str(value)}")
     
     metadata_file_name = os.path.join(dest_folder, os.path.basename(dcm_file) + "_deid_verification.txt")
     os.makedirs(dest_folder, exist_ok=True)
@@ -525,15 +568,32 @@ def extract_all_elements(ds, elements, indent=0, attrs=None, path=""):
         attrs: Optional list of keywords to filter
         path: Current path string for nested elements
     """
+    _extract_elements(
+        ds,
+        elements,
+        indent,
+        None if attrs is None else set(attrs),
+        [path] if path else []
+    )
+
+
+def _extract_elements(ds, elements, indent, attrs, path_parts):
+    """
+    Worker for extract_all_elements.
+    
+    path_parts is shared by the whole walk: a part is pushed when entering a
+    sequence item and popped when leaving it, so the path string is only
+    built for the "[Sequence Item]" lines that print it.
+    """
     for elem in ds:
         keyword = elem.keyword or elem.tag
-        current_path = f"{path}.{keyword}" if path else keyword
         
         if elem.VR == "SQ":
             for i, item in enumerate(elem.value):
-                seq_path = f"{current_path}[{i}]"
-                elements.append(" " * indent + f"[Sequence Item] {seq_path}")
-                extract_all_elements(item, elements, indent + 4, attrs, seq_path)
+                path_parts.append(f"{keyword}[{i}]")
+                elements.append(" " * indent + "[Sequence Item] " + ".".join(path_parts))
+                _extract_elements(item, elements, indent + 4, attrs, path_parts)
+                path_parts.pop()
         else:
             if keyword == "PixelData":
                 continue
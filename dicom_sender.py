@@ -17,7 +17,8 @@ import logging
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Iterable, Optional
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
 
 from pynetdicom import AE, AllStoragePresentationContexts
 from pynetdicom.sop_class import Verification
@@ -28,6 +29,88 @@ from metrics import PerfMetrics, Sample
 logger = logging.getLogger(__name__)
 
 
+def _status_sample(start: float, status) -> Sample:
+    """Build the Sample for a finished C-STORE from its response status."""
+    end = time.perf_counter()
+    success = status and status.Status in (0x0000,)
+    return Sample(
+        start_time=start,
+        end_time=end,
+        success=success,
+        status_code=getattr(status, "Status", None),
+        error=None if success else f"Non-success status: {status!r}",
+    )
+
+
+class DicomSession:
+    """
+    Keeps one association open for many C-STOREs from the same calling AET.
+
+    Create it with DicomSender.session(). If the association is dropped or
+    a send fails, the next send re-associates.
+    """
+
+    def __init__(self, sender: "DicomSender", calling_aet: Optional[str] = None) -> None:
+        self._sender = sender
+        self._ae = sender._build_ae(calling_aet)
+        self._assoc = None
+
+    def send(self, ds, metrics: PerfMetrics) -> None:
+        """
+        Send a single dataset over the session's association.
+
+        The first send (and any send after a reconnect) includes association
+        setup in its latency.
+        """
+        start = time.perf_counter()
+        try:
+            if self._assoc is None or not self._assoc.is_established:
+                self._assoc = self._sender._associate(self._ae)
+                if not self._assoc.is_established:
+                    self._assoc = None
+                    metrics.record(
+                        Sample(
+                            start_time=start,
+                            end_time=time.perf_counter(),
+                            success=False,
+                            error="Association failed",
+                        )
+                    )
+                    return
+
+            status = self._assoc.send_c_store(ds)
+            metrics.record(_status_sample(start, status))
+        except Exception as exc:
+            end = time.perf_counter()
+            logger.exception("Error while sending dataset")
+            self._abort()
+            metrics.record(
+                Sample(
+                    start_time=start,
+                    end_time=end,
+                    success=False,
+                    error=str(exc),
+                )
+            )
+
+    def _abort(self) -> None:
+        if self._assoc is not None:
+            try:
+                self._assoc.abort()
+            except Exception:
+                logger.debug("Error while aborting association", exc_info=True)
+        self._assoc = None
+
+    def close(self) -> None:
+        """Release the association (if open) and shut down the AE."""
+        try:
+            if self._assoc is not None and self._assoc.is_established:
+                self._assoc.release()
+        finally:
+            self._assoc = None
+            self._ae.shutdown()
+
+
 class DicomSender:
     """High-level C-STORE sender with simple concurrency support."""
 
@@ -39,8 +122,9 @@ class DicomSender:
         self.endpoint = endpoint
         self.load_profile = load_profile
 
-    def _build_ae(self) -> AE:
-        ae = AE(ae_title=self.endpoint.local_ae_title.encode("ascii", "ignore"))
+    def _build_ae(self, calling_aet: Optional[str] = None) -> AE:
+        calling_aet = calling_aet or self.endpoint.local_ae_title
+        ae = AE(ae_title=calling_aet.encode("ascii", "ignore"))
         # Add storage presentation contexts (limit to 127 to leave room for Verification)
         storage_contexts = list(AllStoragePresentationContexts)[:127]
         for context in storage_contexts:
@@ -49,22 +133,45 @@ class DicomSender:
         ae.add_requested_context(Verification)
         return ae
 
+    def _associate(self, ae: AE):
+        return ae.associate(
+            self.endpoint.host,
+            self.endpoint.port,
+            ae_title=self.endpoint.remote_ae_title.encode("ascii", "ignore"),
+        )
+
+    @contextmanager
+    def session(self, calling_aet: Optional[str] = None) -> Iterator[DicomSession]:
+        """
+        Context manager yielding a DicomSession that reuses one association.
+
+        Usage:
+            with dicom_sender.session("CT_SCANNER_1") as session:
+                for ds in datasets:
+                    session.send(ds, metrics)
+        """
+        session = DicomSession(self, calling_aet)
+        try:
+            yield session
+        finally:
+            session.close()
+
     def _send_single_dataset(
         self,
         ds,
         metrics: PerfMetrics,
+        calling_aet: Optional[str] = None,
     ) -> None:
         """
         Send a single dataset using a fresh association.
+
+        `calling_aet` overrides the endpoint's local AE title for this
+        association only, so callers never need to mutate the shared endpoint.
         """
         start = time.perf_counter()
-        ae = self._build_ae()
+        ae = self._build_ae(calling_aet)
         try:
-            assoc = ae.associate(
-                self.endpoint.host,
-                self.endpoint.port,
-                ae_title=self.endpoint.remote_ae_title.encode("ascii", "ignore"),
-            )
+            assoc = self._associate(ae)
             if not assoc.is_established:
                 end = time.perf_counter()
                 metrics.record(
@@ -80,17 +187,7 @@ class DicomSender:
             status = assoc.send_c_store(ds)
             assoc.release()
 
-            end = time.perf_counter()
-            success = status and status.Status in (0x0000,)
-            metrics.record(
-                Sample(
-                    start_time=start,
-                    end_time=end,
-                    success=success,
-                    status_code=getattr(status, "Status", None),
-                    error=None if success else f"Non-success status: {status!r}",
-                )
-            )
+            metrics.record(_status_sample(start, status))
         except Exception as exc:
             end = time.perf_counter()
             logger.exception("Error while sending dataset")
@@ -112,12 +209,23 @@ class DicomSender:
         duration_seconds: int,
         concurrency: Optional[int] = None,
         rate_limit_images_per_second: Optional[float] = None,
+        reuse_associations: Optional[bool] = None,
     ) -> int:
         """
         Main hot path for TS_04_Load_Stability-style tests.
+
+        `datasets` may be a collection, which is replayed in order for the
+        whole duration, or an iterator, which is consumed as-is (useful for
+        endless streams of freshly anonymized variants).
+
+        With `reuse_associations` (default: load profile setting) each worker
+        thread keeps one association open for all of its sends instead of
+        associating per message.
         """
         if concurrency is None:
             concurrency = self.load_profile.concurrency
+        if reuse_associations is None:
+            reuse_associations = self.load_profile.reuse_associations
 
         target_rate = rate_limit_images_per_second
         if target_rate is None:
@@ -131,13 +239,33 @@ class DicomSender:
         stop_at = time.perf_counter() + duration_seconds
         total_sent = 0
 
-        ds_cycle = itertools.cycle(datasets)
+        # Callers may pass an endless iterator (e.g. a generator of fresh
+        # variants); cycling it would keep every dataset it yields alive.
+        # Finite collections are replayed in order.
+        if iter(datasets) is datasets:
+            ds_cycle = datasets
+        else:
+            ds_cycle = itertools.cycle(datasets)
         executor = ThreadPoolExecutor(max_workers=concurrency)
         futures = []
 
         lock = threading.Lock()
         next_send_time = time.perf_counter()
 
+        # One session per worker thread; all are closed once the pool is done
+        sessions: List[DicomSession] = []
+        worker_state = threading.local()
+
+        def send_with_session(ds, metrics: PerfMetrics) -> None:
+            session = getattr(worker_state, "session", None)
+            if session is None:
+                session = worker_state.session = DicomSession(self)
+                with lock:
+                    sessions.append(session)
+            session.send(ds, metrics)
+
+        send = send_with_session if reuse_associations else self._send_single_dataset
+
         try:
             while time.perf_counter() < stop_at:
                 now = time.perf_counter()
@@ -145,8 +273,11 @@ class DicomSender:
                     time.sleep(max(next_send_time - now, 0.0))
                 next_send_time = time.perf_counter() + period
 
-                ds = next(ds_cycle)
-                future = executor.submit(self._send_single_dataset, ds, metrics)
+                ds = next(ds_cycle, None)
+                if ds is None:
+                    # A finite iterator ran out before the duration elapsed
+                    break
+                future = executor.submit(send, ds, metrics)
                 futures.append(future)
                 with lock:
                     total_sent += 1
@@ -155,6 +286,8 @@ class DicomSender:
                 _ = f.result()
         finally:
             executor.shutdown(wait=True)
+            for session in sessions:
+                session.close()
 
         return total_sent
 
@@ -167,11 +300,7 @@ class DicomSender:
         try:
             # Note: associate() doesn't take timeout parameter in some pynetdicom versions
             # Use acse_timeout network option instead
-            assoc = ae.associate(
-                self.endpoint.host,
-                self.endpoint.port,
-                ae_title=self.endpoint.remote_ae_title.encode("ascii", "ignore"),
-            )
+            assoc = self._associate(ae)
             if not assoc.is_established:
                 return False
             status = assoc.send_c_echo()
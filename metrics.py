@@ -7,15 +7,20 @@ We focus on:
 - total messages sent
 - successes / failures
 - latency distribution (min/avg/p95)
+
+Percentiles come from a streaming log-bucketed histogram (HDR-style) that is
+updated as samples are recorded, so reading p95 mid-run does not sort every
+latency collected so far.
 """
 
 from __future__ import annotations
 
+import math
 import statistics
 import threading
 import time
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -33,22 +38,84 @@ class Sample:
         return (self.end_time - self.start_time) * 1000.0
 
 
+@dataclass
+class LatencyHistogram:
+    """
+    Streaming latency histogram with bounded relative error.
+
+    Values are counted in logarithmic buckets that each span 1 percent, so
+    a reported percentile is within 1 percent of the exact sample value and
+    memory depends on the latency range, not the number of samples.
+    Not thread-safe on its own; PerfMetrics guards it with its lock.
+    """
+
+    min_value_ms: float = 0.001
+    growth: float = 1.01
+    _counts: Dict[int, int] = field(default_factory=dict)
+    _count: int = 0
+    _max_ms: float = 0.0
+
+    def record(self, value_ms: float) -> None:
+        if value_ms > self.min_value_ms:
+            index = math.ceil(math.log(value_ms / self.min_value_ms, self.growth))
+        else:
+            index = 0
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self._count += 1
+        self._max_ms = max(self._max_ms, value_ms)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def value_at_rank(self, rank: int) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the rank-th smallest value (1-based),
+        capped at the largest value recorded.
+        """
+        if self._count == 0:
+            return None
+        rank = max(1, min(rank, self._count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(self.min_value_ms * self.growth ** index, self._max_ms)
+        return self._max_ms
+
+
 @dataclass
 class PerfMetrics:
-    """Aggregated, thread-safe metrics."""
+    """
+    Aggregated, thread-safe metrics.
+
+    Percentiles come from the histogram, but every Sample is still kept on
+    purpose: samples, last_sample, the success/failure counts, min/avg
+    latency and throughput_per_second (which needs start and end times) all
+    read them, so memory still grows with the number of messages.
+    """
 
     _samples: List[Sample] = field(default_factory=list)
     _lock: threading.Lock = field(default_factory=threading.Lock)
+    _latency_histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
 
     def record(self, sample: Sample) -> None:
         with self._lock:
             self._samples.append(sample)
+            if sample.success:
+                self._latency_histogram.record(sample.latency_ms)
 
     @property
     def samples(self) -> List[Sample]:
         with self._lock:
             return list(self._samples)
 
+    @property
+    def last_sample(self) -> Optional[Sample]:
+        """Most recently recorded sample, without copying the sample list."""
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
     @property
     def total(self) -> int:
         return len(self.samples)
@@ -80,14 +147,17 @@ class PerfMetrics:
         lat = self._latencies()
         return statistics.mean(lat) if lat else None
 
+    def latency_percentile_ms(self, percentile: float) -> Optional[float]:
+        """
+        Latency percentile (0-100) over successful samples, within 1 percent.
+        """
+        with self._lock:
+            histogram = self._latency_histogram
+            return histogram.value_at_rank(int(histogram.count * percentile / 100.0))
+
     @property
     def p95_latency_ms(self) -> Optional[float]:
-        lat = sorted(self._latencies())
-        if not lat:
-            return None
-        k = int(len(lat) * 0.95) - 1
-        k = max(0, min(k, len(lat) - 1))
-        return lat[k]
+        return self.latency_percentile_ms(95)
 
     def throughput_per_second(self, window_seconds: Optional[float] = None) -> float:
         """
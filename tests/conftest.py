@@ -5,6 +5,7 @@ Global pytest fixtures for testing.
 Works with flat project structure - compass_perf modules in root directory.
 """
 
+import json
 import os
 import sys
 from pathlib import Path
@@ -70,6 +71,36 @@ def dicom_sender(perf_config: TestConfig) -> DicomSender:
     )
 
 
+@pytest.fixture(scope="session")
+def compass_reachable(dicom_sender: DicomSender) -> bool:
+    """
+    Verify once per session that Compass answers a C-ECHO ping.
+    
+    Tests that need a live Compass should request this fixture instead of
+    pinging on their own, so the whole run pays for a single ECHO.
+    """
+    assert dicom_sender.ping(timeout_seconds=10), "Compass did not respond to C-ECHO ping"
+    return True
+
+
+@pytest.fixture(scope="session")
+def run_log():
+    """
+    Structured per-send records collected over the whole session.
+    
+    Tests append one dict per send (test, aet, modality, status, latency_ms,
+    ...). At session end the list is written as a single JSON file to the
+    path in DICOMAUTO_RUN_LOG, if that is set.
+    """
+    events: List[dict] = []
+    yield events
+    
+    path = os.environ.get("DICOMAUTO_RUN_LOG")
+    if path and events:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(events, fh, indent=2)
+
+
 # Legacy fixtures for backward compatibility
 @pytest.fixture(scope="session")
 def compass_config(perf_config):
@@ -297,21 +328,26 @@ def test_dicom_with_attributes(single_dicom_file):
     Factory fixture to create test DICOM files with specific attributes.
     
     This fixture returns a function that creates DICOM files with custom
-    attributes for transformation testing.
+    attributes for transformation testing. The function returns a context
+    manager; the temp file is deleted when the with-block exits.
     
     Usage:
-        test_file_path, dataset = test_dicom_with_attributes(
+        with test_dicom_with_attributes(
             modality='OPV',
             series_description='GPA',
             patient_id='TEST123'
-        )
+        ) as (test_file_path, dataset):
+            ...
     
     Returns:
-        Function that takes **kwargs and returns (file_path, dataset) tuple
+        Function that takes **kwargs and returns a context manager yielding
+        a (file_path, dataset) tuple
     """
+    import contextlib
     import tempfile
     from pydicom.uid import generate_uid
     
+    @contextlib.contextmanager
     def _create_test_file(**attributes):
         """
         Create a DICOM file with specified attributes.
@@ -320,7 +356,7 @@ def test_dicom_with_attributes(single_dicom_file):
             **attributes: DICOM attributes in snake_case or PascalCase
                          (e.g., modality='CT' or Modality='CT')
         
-        Returns:
+        Yields:
             Tuple of (file_path, dataset)
         """
         ds = load_dataset(single_dicom_file)
@@ -344,8 +380,12 @@ def test_dicom_with_attributes(single_dicom_file):
         # Save to temp file
         temp_fd, temp_path = tempfile.mkstemp(suffix='.dcm', prefix='test_transform_')
         os.close(temp_fd)
-        ds.save_as(temp_path)
-        
-        return temp_path, ds
+        try:
+            ds.save_as(temp_path)
+            yield temp_path, ds
+        finally:
+            # A single unlink; no exists() check needed
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
     
     return _create_test_file
@@ -9,69 +9,128 @@ This test validates the end-to-end workflow:
 3. Verify successful transmission
 """
 
+import functools
+import itertools
 import os
-import shutil
 import tempfile
-from datetime import datetime
-from typing import Tuple
+import threading
+import time
+from typing import Dict, Optional, Tuple
 
 import pytest
 from pydicom import dcmread
+from pydicom.dataset import Dataset
+from pydicom.tag import Tag
 from pydicom.uid import generate_uid
 
 # Import framework modules from root
 from dicom_sender import DicomSender
 from metrics import PerfMetrics
 
+# Per-file progress output is off by default; set DICOMAUTO_TEST_VERBOSE=1 to see it
+VERBOSE = os.environ.get("DICOMAUTO_TEST_VERBOSE") == "1"
+
+
+def _vprint(msg: str = "") -> None:
+    """Print a progress message only when verbose output is enabled."""
+    if VERBOSE:
+        print(msg)
+
+
+# UID tags that get new values for every file. Tags are built once here
+# rather than on every call.
+STUDY_INSTANCE_UID_TAG = Tag(0x0020, 0x000d)
+ACCESSION_NUMBER_TAG = Tag(0x0008, 0x0050)
+SERIES_INSTANCE_UID_TAG = Tag(0x0020, 0x000e)
+SOP_INSTANCE_UID_TAG = Tag(0x0008, 0x0018)
+
+# (tag, VR, value) for the patient demographics written to every file
+PATIENT_TAG_UPDATES = (
+    (Tag(0x0010, 0x0020), 'LO', "11043207"),
+    (Tag(0x0010, 0x0010), 'PN', "ZZTESTPATIENT^ANONYMIZED"),
+    (Tag(0x0010, 0x0030), 'DA', "19010101"),
+    (Tag(0x0008, 0x0080), 'LO', "TEST FACILITY"),
+    (Tag(0x0008, 0x0090), 'PN', "TEST^PROVIDER"),
+)
+
+
+# Sequence number appended to accession numbers
+_ACCESSION_COUNTER = itertools.count()
+_ACCESSION_LOCK = threading.Lock()
+
 
 def generate_accession_number() -> str:
-    """Generate a unique accession number based on current timestamp."""
-    now = datetime.now()
-    microseconds = now.microsecond
-    return f"{now.strftime('%Y%m%d-%H%M%S')}-{microseconds:06d}"
+    """
+    Generate a unique accession number based on current timestamp.
+    
+    YYMMDDHHMMSS plus a 4-digit sequence number, which fits the 16-character
+    SH limit and can't collide within a single second.
+    """
+    with _ACCESSION_LOCK:
+        sequence = next(_ACCESSION_COUNTER) % 10_000
+    return f"{_accession_timestamp(int(time.time()))}{sequence:04d}"
+
 
+@functools.lru_cache(maxsize=1)
+def _accession_timestamp(seconds: int) -> str:
+    """Format the YYMMDDHHMMSS part of an accession number (cached per second)."""
+    return time.strftime('%y%m%d%H%M%S', time.localtime(seconds))
 
-def update_tag_recursively(ds, tag_tuple: Tuple, value, vr: str = None) -> int:
+
+def update_tags_recursively(ds, replacements: Dict[Tuple[int, int], object]) -> int:
     """
-    Recursively update a tag in the dataset and all nested sequences.
+    Update several tags in the dataset and all nested sequences in one pass.
+    
+    The whole tree (including sequence items) is walked once, no matter how
+    many tags are being replaced. Each dataset's element map is read
+    directly, so only the replaced elements and the sequences get converted
+    from their raw form, rather than every element in the file.
     
     Args:
         ds: pydicom Dataset object
-        tag_tuple: Tuple of (group, element) for the tag
-        value: Value to set for the tag
-        vr: Value Representation (e.g., 'PN', 'LO', 'DA')
+        replacements: Mapping of Tag or (group, element) keys to the new values
         
     Returns:
-        Count of how many times the tag was updated
+        Count of how many elements were updated
     """
+    wanted = {Tag(tag_tuple): value for tag_tuple, value in replacements.items()}
     count = 0
     
-    if tag_tuple in ds:
-        ds[tag_tuple].value = value
-        count += 1
-    
-    for elem in ds:
-        if elem.VR == "SQ" and elem.value:
-            for seq_item in elem.value:
-                count += update_tag_recursively(seq_item, tag_tuple, value, vr)
+    pending = [ds]
+    while pending:
+        dataset = pending.pop()
+        for tag, elem in dataset._dict.items():
+            if tag in wanted:
+                dataset[tag].value = wanted[tag]
+                count += 1
+            elif elem.VR in ("SQ", None):
+                # Raw elements from implicit VR files have no VR until converted
+                elem = dataset[tag]
+                if elem.VR == "SQ":
+                    pending.extend(elem.value)
     
     return count
 
 
-def anonymize_dicom_file(input_file: str, output_file: str) -> Tuple[bool, str, dict]:
+def anonymize_dicom_file(
+    input_file: str, output_file: str
+) -> Tuple[bool, str, dict, Optional[Dataset]]:
     """
     Anonymize a DICOM file by updating all PHI tags.
     
+    The anonymized dataset is returned alongside the saved file so callers
+    can check and send it without parsing the output file again.
+    
     Returns:
-        Tuple of (success, message, new_uids_dict)
+        Tuple of (success, message, new_uids_dict, anonymized_dataset)
     """
     try:
-        print(f"\n{'='*60}")
-        print("STEP 1: ANONYMIZING DICOM FILE")
-        print(f"{'='*60}")
+        _vprint(f"\n{'='*60}")
+        _vprint("STEP 1: ANONYMIZING DICOM FILE")
+        _vprint(f"{'='*60}")
         
         ds = dcmread(input_file)
-        print(f"  [OK] File read successfully: {os.path.basename(input_file)}")
+        _vprint(f"  [OK] File read successfully: {os.path.basename(input_file)}")
         
         # Generate new unique identifiers
         new_study_uid = generate_uid()
@@ -79,49 +138,36 @@ def anonymize_dicom_file(input_file: str, output_file: str) -> Tuple[bool, str,
         new_series_uid = generate_uid()
         new_sop_instance_uid = generate_uid()
         
-        print(f"  [OK] Generated new StudyInstanceUID: {new_study_uid}")
+        _vprint(f"  [OK] Generated new StudyInstanceUID: {new_study_uid}")
         
-        # Update UIDs (including nested sequences)
-        if (0x0020, 0x000d) not in ds:
-            ds.add_new((0x0020, 0x000d), 'UI', new_study_uid)
-        update_tag_recursively(ds, (0x0020, 0x000d), new_study_uid, 'UI')
+        # (tag, VR, value) for every UID and PHI tag we overwrite
+        updates = [
+            (STUDY_INSTANCE_UID_TAG, 'UI', new_study_uid),
+            (ACCESSION_NUMBER_TAG, 'SH', new_accession_number),
+            (SERIES_INSTANCE_UID_TAG, 'UI', new_series_uid),
+            (SOP_INSTANCE_UID_TAG, 'UI', new_sop_instance_uid),
+            *PATIENT_TAG_UPDATES,
+        ]
         
-        if (0x0008, 0x0050) not in ds:
-            ds.add_new((0x0008, 0x0050), 'SH', new_accession_number)
-        update_tag_recursively(ds, (0x0008, 0x0050), new_accession_number, 'SH')
+        # Check the element dict directly rather than going through
+        # Dataset.__contains__, which re-coerces the key on every call
+        for tag, vr, value in updates:
+            if tag not in ds._dict:
+                ds.add_new(tag, vr, value)
         
-        if (0x0020, 0x000e) not in ds:
-            ds.add_new((0x0020, 0x000e), 'UI', new_series_uid)
-        update_tag_recursively(ds, (0x0020, 0x000e), new_series_uid, 'UI')
+        # Update all tags (including nested sequences) in a single walk
+        update_tags_recursively(ds, {tag: value for tag, _, value in updates})
         
-        if (0x0008, 0x0018) not in ds:
-            ds.add_new((0x0008, 0x0018), 'UI', new_sop_instance_uid)
-        update_tag_recursively(ds, (0x0008, 0x0018), new_sop_instance_uid, 'UI')
-        
-        # Anonymize patient demographics
-        if (0x0010, 0x0020) not in ds:
-            ds.add_new((0x0010, 0x0020), 'LO', "11043207")
-        update_tag_recursively(ds, (0x0010, 0x0020), "11043207", 'LO')
-        
-        if (0x0010, 0x0010) not in ds:
-            ds.add_new((0x0010, 0x0010), 'PN', "ZZTESTPATIENT^ANONYMIZED")
-        update_tag_recursively(ds, (0x0010, 0x0010), "ZZTESTPATIENT^ANONYMIZED", 'PN')
-        
-        if (0x0010, 0x0030) not in ds:
-            ds.add_new((0x0010, 0x0030), 'DA', "19010101")
-        update_tag_recursively(ds, (0x0010, 0x0030), "19010101", 'DA')
-        
-        if (0x0008, 0x0080) not in ds:
-            ds.add_new((0x0008, 0x0080), 'LO', "TEST FACILITY")
-        update_tag_recursively(ds, (0x0008, 0x0080), "TEST FACILITY", 'LO')
-        
-        if (0x0008, 0x0090) not in ds:
-            ds.add_new((0x0008, 0x0090), 'PN', "TEST^PROVIDER")
-        update_tag_recursively(ds, (0x0008, 0x0090), "TEST^PROVIDER", 'PN')
+        # Only dataset tags changed, so keep the original File Meta and
+        # preamble instead of regenerating them; just keep the SOP Instance
+        # UID in the File Meta in step with the dataset
+        file_meta = getattr(ds, 'file_meta', None)
+        if file_meta is not None and 'MediaStorageSOPInstanceUID' in file_meta:
+            file_meta.MediaStorageSOPInstanceUID = new_sop_instance_uid
         
         # Save anonymized file
-        ds.save_as(output_file, write_like_original=False)
-        print(f"  [OK] Anonymized file saved")
+        ds.save_as(output_file)
+        _vprint(f"  [OK] Anonymized file saved")
         
         new_uids = {
             'study_uid': new_study_uid,
@@ -130,39 +176,35 @@ def anonymize_dicom_file(input_file: str, output_file: str) -> Tuple[bool, str,
             'sop_instance_uid': new_sop_instance_uid
         }
         
-        return True, "Successfully anonymized", new_uids
+        return True, "Successfully anonymized", new_uids, ds
         
     except Exception as e:
-        return False, f"Error during anonymization: {e}", {}
+        return False, f"Error during anonymization: {e}", {}, None
 
 
-@pytest.fixture
-def temp_anonymized_file(dicom_files):
+@pytest.fixture(scope="session")
+def temp_anonymized_file(dicom_files, tmp_path_factory):
     """
     Fixture that creates an anonymized copy of the first DICOM file.
-    Cleans up after test completes.
+    
+    Session-scoped so the file is anonymized once and shared by every test
+    that uses it. pytest's tmp_path_factory owns the directory cleanup.
     """
-    # Create temp directory
-    temp_dir = tempfile.mkdtemp(prefix="test_anon_")
-    anonymized_path = os.path.join(temp_dir, "anonymized.dcm")
+    anonymized_path = str(tmp_path_factory.mktemp("anon") / "anonymized.dcm")
     
     # Anonymize the first file
-    success, message, uids = anonymize_dicom_file(str(dicom_files[0]), anonymized_path)
+    success, message, uids, ds = anonymize_dicom_file(str(dicom_files[0]), anonymized_path)
     
     if not success:
-        shutil.rmtree(temp_dir)
         pytest.fail(f"Failed to create anonymized file: {message}")
     
-    yield anonymized_path, uids
-    
-    # Cleanup
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
+    return anonymized_path, uids, ds
 
 
 @pytest.mark.integration
 def test_anonymize_and_send_single_file(
     dicom_sender: DicomSender,
+    compass_reachable,
     temp_anonymized_file,
     metrics: PerfMetrics,
 ):
@@ -174,22 +216,17 @@ def test_anonymize_and_send_single_file(
     - Compass accepts the anonymized file
     - Transmission completes successfully with acceptable latency
     """
-    anonymized_path, new_uids = temp_anonymized_file
+    anonymized_path, new_uids, ds = temp_anonymized_file
     
     print(f"\n{'='*60}")
     print("STEP 2: SENDING TO COMPASS SERVER")
     print(f"{'='*60}")
     
-    # Verify Compass is reachable
-    print("  Checking Compass connectivity (C-ECHO)...")
-    assert dicom_sender.ping(timeout_seconds=10), "Compass did not respond to C-ECHO ping"
+    # Compass reachability (C-ECHO) is checked once per session by compass_reachable
     print("  [OK] Compass server is reachable")
     
-    # Load and verify the anonymized dataset
-    print(f"  Loading anonymized file...")
-    ds = dcmread(anonymized_path)
-    
-    # Verify anonymization was successful
+    # Verify anonymization was successful (against the in-memory dataset)
+    assert os.path.isfile(anonymized_path), "Anonymized file was not written"
     assert str(ds.StudyInstanceUID) == new_uids['study_uid'], "StudyInstanceUID mismatch"
     assert str(ds.PatientName) == "ZZTESTPATIENT^ANONYMIZED", "PatientName not anonymized"
     assert str(ds.PatientID) == "11043207", "PatientID not anonymized"
@@ -229,6 +266,7 @@ def test_anonymize_and_send_from_shared_drive(
     dicom_sender: DicomSender,
     metrics: PerfMetrics,
     perf_config,
+    request,
 ):
     """
     Integration test using a file path from environment variable.
@@ -247,30 +285,23 @@ def test_anonymize_and_send_from_shared_drive(
     if not os.path.exists(input_file):
         pytest.fail(f"Input file does not exist: {input_file}")
     
-    # Create temp directory for anonymized file
-    temp_dir = tempfile.mkdtemp(prefix="test_shared_")
-    anonymized_path = os.path.join(temp_dir, "anonymized.dcm")
+    # Requested here rather than as an argument so the skip above doesn't need Compass
+    request.getfixturevalue("compass_reachable")
     
-    try:
+    # Create temp directory for anonymized file
+    with tempfile.TemporaryDirectory(prefix="test_shared_") as temp_dir:
+        anonymized_path = os.path.join(temp_dir, "anonymized.dcm")
+        
         # Step 1: Anonymize
-        success, message, new_uids = anonymize_dicom_file(input_file, anonymized_path)
+        success, message, new_uids, ds = anonymize_dicom_file(input_file, anonymized_path)
         assert success, f"Anonymization failed: {message}"
         
-        # Step 2: Verify connectivity
-        assert dicom_sender.ping(), "Compass did not respond to C-ECHO ping"
-        
-        # Step 3: Send to Compass
-        ds = dcmread(anonymized_path)
+        # Step 2: Send to Compass
         dicom_sender._send_single_dataset(ds, metrics)
         
-        # Step 4: Verify success
+        # Step 3: Verify success
         assert metrics.successes == 1, f"Send failed with {metrics.failures} failures"
         assert metrics.error_rate == 0, f"Error rate {metrics.error_rate:.1%} too high"
         
         snapshot = metrics.snapshot()
         print(f"\n[SUCCESS] Test passed. Metrics: {snapshot}")
-        
-    finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-
@@ -15,52 +15,66 @@ These tests send images using various calling AE Titles to ensure:
 
 from __future__ import annotations
 
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
 import pytest
+from pydicom.datadict import dictionary_VR, tag_for_keyword
 from pydicom.uid import generate_uid
 
 from data_loader import load_dataset
 from metrics import PerfMetrics
 
+# Per-send progress lines are off by default; set DICOMAUTO_TEST_VERBOSE=1 to see them
+VERBOSE = os.environ.get("DICOMAUTO_TEST_VERBOSE") == "1"
+
+# Set DICOMAUTO_TEST_FAIL_FAST=1 to stop the AET/modality matrix at the first failed send
+FAIL_FAST = os.environ.get("DICOMAUTO_TEST_FAIL_FAST") == "1"
+
 
 # ============================================================================
 # Calling AE Title Test Cases
 # ============================================================================
 
+@dataclass(frozen=True)
+class AETCase:
+    """One calling AE Title to test."""
+
+    name: str  # Short identifier used as the pytest id (no spaces)
+    description: str  # Human-readable description of the device/system
+    aet: str  # The actual AE Title string
+
+
 # Define the calling AE Titles to test
 # Add your actual calling AE Titles here
-CALLING_AET_TEST_CASES = [
-    {
-        'name': 'ULTRA_MCR_FORUM',
-        'description': 'Ultra OCT imaging device',
-        'aet': 'ULTRA_MCR_FORUM',
-    },
-    {
-        'name': 'CT_SCANNER_1',
-        'description': 'CT Scanner #1',
-        'aet': 'CT_SCANNER_1',
-    },
-    {
-        'name': 'MR_SCANNER_A',
-        'description': 'MR Scanner A',
-        'aet': 'MR_SCANNER_A',
-    },
-    {
-        'name': 'CR_ROOM_1',
-        'description': 'CR Room 1',
-        'aet': 'CR_ROOM_1',
-    },
-    {
-        'name': 'US_PORTABLE',
-        'description': 'Portable Ultrasound',
-        'aet': 'US_PORTABLE',
-    },
+CALLING_AET_TEST_CASES = (
+    AETCase('ULTRA_MCR_FORUM', 'Ultra OCT imaging device', 'ULTRA_MCR_FORUM'),
+    AETCase('CT_SCANNER_1', 'CT Scanner #1', 'CT_SCANNER_1'),
+    AETCase('MR_SCANNER_A', 'MR Scanner A', 'MR_SCANNER_A'),
+    AETCase('CR_ROOM_1', 'CR Room 1', 'CR_ROOM_1'),
+    AETCase('US_PORTABLE', 'Portable Ultrasound', 'US_PORTABLE'),
     # Add more calling AE Titles as needed:
-    # {
-    #     'name': 'YOUR_DEVICE_NAME',
-    #     'description': 'Device description',
-    #     'aet': 'YOUR_AE_TITLE',
-    # },
-]
+    # AETCase('YOUR_DEVICE_NAME', 'Device description', 'YOUR_AE_TITLE'),
+)
+
+
+def _copy_with_values(base_ds, **values):
+    """
+    Return a copy of base_ds with the given DICOM keywords set to new values.
+    
+    Only the element map is copied: the changed elements are created fresh
+    with add_new, so base_ds is never modified, and every other element
+    (pixel data included) is shared with it. Attribute assignment can't be
+    used on such a copy because it changes shared elements in place.
+    """
+    ds = copy.copy(base_ds)
+    ds._dict = dict(base_ds._dict)
+    for keyword, value in values.items():
+        tag = tag_for_keyword(keyword)
+        ds.add_new(tag, dictionary_VR(tag), value)
+    return ds
 
 
 # ============================================================================
@@ -68,11 +82,12 @@ CALLING_AET_TEST_CASES = [
 # ============================================================================
 
 @pytest.mark.integration
-@pytest.mark.parametrize("test_case", CALLING_AET_TEST_CASES, ids=lambda tc: tc['name'])
+@pytest.mark.parametrize("test_case", CALLING_AET_TEST_CASES, ids=lambda tc: tc.name)
 def test_calling_aet_routing(
-    test_case: dict,
+    test_case: AETCase,
     single_dicom_file,
     dicom_sender,
+    compass_reachable,
     metrics: PerfMetrics
 ):
     """
@@ -86,7 +101,7 @@ def test_calling_aet_routing(
     5. Documents study UID for manual verification
     
     To add more calling AE Titles:
-    - Add entries to CALLING_AET_TEST_CASES list above
+    - Add AETCase entries to CALLING_AET_TEST_CASES above
     - Run: pytest tests/test_calling_aet_routing.py -v -s
     
     Manual verification required:
@@ -94,12 +109,12 @@ def test_calling_aet_routing(
     - Verify the calling AET was correctly recorded
     - Verify appropriate routing rules were applied
     """
-    calling_aet = test_case['aet']
+    calling_aet = test_case.aet
     
     print(f"\n{'='*70}")
     print(f"TEST: Calling AET = {calling_aet}")
     print(f"{'='*70}")
-    print(f"Description: {test_case['description']}")
+    print(f"Description: {test_case.description}")
     
     # Load base file
     ds = load_dataset(single_dicom_file)
@@ -115,49 +130,37 @@ def test_calling_aet_routing(
     
     # Add marker in StudyDescription for easy identification
     study_desc = f"AET_TEST_{calling_aet}"
-    if hasattr(ds, 'StudyDescription'):
-        ds.StudyDescription = study_desc
-    else:
-        ds.add_new((0x0008, 0x1030), 'LO', study_desc)
+    ds.StudyDescription = study_desc  # Created with the dictionary VR if missing
     
     print(f"\n[TEST IDENTIFIERS]")
     print(f"  StudyInstanceUID: {test_study_uid}")
     print(f"  StudyDescription: {ds.StudyDescription}")
     print(f"  Calling AE Title: {calling_aet}")
     
-    # Override the local AE title (calling AET)
-    original_aet = dicom_sender.endpoint.local_ae_title
-    dicom_sender.endpoint.local_ae_title = calling_aet
+    # Send to Compass
+    print(f"\n[SENDING]")
+    print(f"  From (Calling AET): {calling_aet}")
+    print(f"  To (Called AET): {dicom_sender.endpoint.remote_ae_title}")
+    print(f"  Host: {dicom_sender.endpoint.host}:{dicom_sender.endpoint.port}")
     
-    try:
-        # Send to Compass
-        print(f"\n[SENDING]")
-        print(f"  From (Calling AET): {calling_aet}")
-        print(f"  To (Called AET): {dicom_sender.endpoint.remote_ae_title}")
-        print(f"  Host: {dicom_sender.endpoint.host}:{dicom_sender.endpoint.port}")
-        
-        dicom_sender._send_single_dataset(ds, metrics)
-        
-        # Verify send succeeded
-        assert metrics.successes == 1, \
-            f"Send failed from {calling_aet}: {metrics.failures} failures, " \
-            f"error rate: {metrics.error_rate:.1%}"
-        
-        print(f"  Status: SUCCESS")
-        print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
-        
-        # Verification instructions
-        print(f"\n[MANUAL VERIFICATION]")
-        print(f"  1. Query Compass for StudyInstanceUID: {test_study_uid}")
-        print(f"  2. Verify calling AE Title is: {calling_aet}")
-        print(f"  3. Verify study was routed/processed correctly for this source")
-        print(f"  4. Verify StudyDescription contains: {study_desc}")
-        
-        print(f"\n[RESULT: SEND SUCCESSFUL - MANUAL VERIFICATION PENDING]")
-        
-    finally:
-        # Restore original AE title
-        dicom_sender.endpoint.local_ae_title = original_aet
+    dicom_sender._send_single_dataset(ds, metrics, calling_aet=calling_aet)
+    
+    # Verify send succeeded
+    assert metrics.successes == 1, \
+        f"Send failed from {calling_aet}: {metrics.failures} failures, " \
+        f"error rate: {metrics.error_rate:.1%}"
+    
+    print(f"  Status: SUCCESS")
+    print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
+    
+    # Verification instructions
+    print(f"\n[MANUAL VERIFICATION]")
+    print(f"  1. Query Compass for StudyInstanceUID: {test_study_uid}")
+    print(f"  2. Verify calling AE Title is: {calling_aet}")
+    print(f"  3. Verify study was routed/processed correctly for this source")
+    print(f"  4. Verify StudyDescription contains: {study_desc}")
+    
+    print(f"\n[RESULT: SEND SUCCESSFUL - MANUAL VERIFICATION PENDING]")
 
 
 # ============================================================================
@@ -179,8 +182,8 @@ def test_all_calling_aets_summary():
     print(f"\nCalling AE Titles:")
     
     for i, test_case in enumerate(CALLING_AET_TEST_CASES, 1):
-        print(f"\n{i}. {test_case['aet']}")
-        print(f"   Description: {test_case['description']}")
+        print(f"\n{i}. {test_case.aet}")
+        print(f"   Description: {test_case.description}")
     
     print(f"\n{'='*70}")
     print(f"To run all AET tests:")
@@ -200,6 +203,7 @@ def test_all_calling_aets_summary():
 def test_multiple_aets_batch_send(
     small_dicom_files,
     dicom_sender,
+    compass_reachable,
 ):
     """
     Advanced test: Send multiple files using multiple different calling AETs.
@@ -212,6 +216,8 @@ def test_multiple_aets_batch_send(
     - Multiple sources can send concurrently
     - Each source's studies are tracked independently
     """
+    from collections import defaultdict
+    from contextlib import ExitStack
     from itertools import cycle
     
     print(f"\n{'='*70}")
@@ -221,17 +227,21 @@ def test_multiple_aets_batch_send(
     print(f"  Calling AETs: {len(CALLING_AET_TEST_CASES)}")
     
     # Cycle through calling AETs for each file
-    aet_cycle = cycle([tc['aet'] for tc in CALLING_AET_TEST_CASES])
+    aet_cycle = cycle([tc.aet for tc in CALLING_AET_TEST_CASES])
     
-    results = []
-    original_aet = dicom_sender.endpoint.local_ae_title
+    # Per-AET [sends, successes, latency_sum_ms], accumulated while sending
+    per_aet = defaultdict(lambda: [0, 0, 0.0])
+    failed = []
+    # One association per calling AET, kept open for the whole batch
+    sessions = {}
+    # One collector for the whole batch; per-send results come from its last sample
+    metrics = PerfMetrics()
     
     print(f"\n[SENDING]")
     
-    try:
+    with ExitStack() as open_sessions:
         for i, file in enumerate(small_dicom_files):
             calling_aet = next(aet_cycle)
-            metrics = PerfMetrics()
             
             # Load and modify file
             ds = load_dataset(file)
@@ -239,57 +249,54 @@ def test_multiple_aets_batch_send(
             ds.SeriesInstanceUID = generate_uid()
             ds.SOPInstanceUID = generate_uid()
             
-            # Set calling AET
-            dicom_sender.endpoint.local_ae_title = calling_aet
-            
-            # Send
-            dicom_sender._send_single_dataset(ds, metrics)
+            # Send from this calling AET, reusing its association
+            session = sessions.get(calling_aet)
+            if session is None:
+                session = sessions[calling_aet] = open_sessions.enter_context(
+                    dicom_sender.session(calling_aet)
+                )
+            session.send(ds, metrics)
+            sample = metrics.last_sample
             
             # Track results
-            result = {
-                'file': file.name,
-                'calling_aet': calling_aet,
-                'study_uid': ds.StudyInstanceUID,
-                'success': metrics.successes == 1,
-                'latency': metrics.avg_latency_ms
-            }
-            results.append(result)
+            stats = per_aet[calling_aet]
+            stats[0] += 1
+            stats[2] += sample.latency_ms
+            if sample.success:
+                stats[1] += 1
+            else:
+                failed.append((calling_aet, file.name))
             
-            status = 'OK  ' if result['success'] else 'FAIL'
-            print(f"  [{i+1:2d}/{len(small_dicom_files)}] {calling_aet:20} -> "
-                  f"{status} ({result['latency']:.0f}ms) | StudyUID: {ds.StudyInstanceUID[:40]}...")
-        
-        # Summary
-        print(f"\n{'='*70}")
-        print(f"[RESULTS SUMMARY]")
-        print(f"{'='*70}")
-        print(f"  Total sent: {len(results)}")
-        print(f"  Successful: {sum(1 for r in results if r['success'])}")
-        print(f"  Failed: {sum(1 for r in results if not r['success'])}")
-        
-        # Group by calling AET
-        from collections import Counter
-        aet_counts = Counter(r['calling_aet'] for r in results)
-        print(f"\n  Sends per calling AET:")
-        for aet, count in sorted(aet_counts.items()):
-            successes = sum(1 for r in results if r['calling_aet'] == aet and r['success'])
-            avg_latency = sum(r['latency'] for r in results if r['calling_aet'] == aet) / count
-            print(f"    {aet:20} : {successes}/{count} succeeded, avg {avg_latency:.0f}ms")
-        
-        # Verify all succeeded
-        failed = [r for r in results if not r['success']]
-        if failed:
-            print(f"\n  Failed sends:")
-            for r in failed:
-                print(f"    - {r['calling_aet']} : {r['file']}")
-        
-        assert all(r['success'] for r in results), \
-            f"Some sends failed: {len(failed)}/{len(results)}"
-        
-        print(f"\n[SUCCESS: All {len(results)} sends completed successfully]")
-        
-    finally:
-        dicom_sender.endpoint.local_ae_title = original_aet
+            if VERBOSE:
+                status = 'OK  ' if sample.success else 'FAIL'
+                print(f"  [{i+1:2d}/{len(small_dicom_files)}] {calling_aet:20} -> "
+                      f"{status} ({sample.latency_ms:.0f}ms) | StudyUID: {ds.StudyInstanceUID[:40]}...")
+    
+    # Summary
+    print(f"\n{'='*70}")
+    print(f"[RESULTS SUMMARY]")
+    print(f"{'='*70}")
+    print(f"  Total sent: {metrics.total}")
+    print(f"  Successful: {metrics.successes}")
+    print(f"  Failed: {metrics.failures}")
+    if metrics.p95_latency_ms is not None:
+        print(f"  Latency: avg {metrics.avg_latency_ms:.0f}ms, p95 {metrics.p95_latency_ms:.0f}ms")
+    
+    # Group by calling AET
+    print(f"\n  Sends per calling AET:")
+    for aet, (count, successes, latency_sum) in sorted(per_aet.items()):
+        print(f"    {aet:20} : {successes}/{count} succeeded, avg {latency_sum / count:.0f}ms")
+    
+    # Verify all succeeded
+    if failed:
+        print(f"\n  Failed sends:")
+        for aet, file_name in failed:
+            print(f"    - {aet} : {file_name}")
+    
+    assert not failed, \
+        f"Some sends failed: {len(failed)}/{metrics.total}"
+    
+    print(f"\n[SUCCESS: All {metrics.total} sends completed successfully]")
 
 
 # ============================================================================
@@ -300,6 +307,8 @@ def test_multiple_aets_batch_send(
 def test_unknown_calling_aet(
     single_dicom_file,
     dicom_sender,
+    compass_reachable,
+    run_log: list,
     metrics: PerfMetrics
 ):
     """
@@ -328,45 +337,42 @@ def test_unknown_calling_aet(
     
     # Add marker
     study_desc = f"UNKNOWN_AET_TEST_{unknown_aet}"
-    if hasattr(ds, 'StudyDescription'):
-        ds.StudyDescription = study_desc
-    else:
-        ds.add_new((0x0008, 0x1030), 'LO', study_desc)
+    ds.StudyDescription = study_desc  # Created with the dictionary VR if missing
     
     print(f"  StudyInstanceUID: {test_study_uid}")
     
-    original_aet = dicom_sender.endpoint.local_ae_title
-    dicom_sender.endpoint.local_ae_title = unknown_aet
-    
-    try:
-        print(f"\n[SENDING]")
-        dicom_sender._send_single_dataset(ds, metrics)
-        
-        print(f"\n[RESULT]")
-        if metrics.successes == 1:
-            print(f"  Status: ACCEPTED")
-            print(f"  Compass accepted unknown calling AET '{unknown_aet}'")
-            print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
-            print(f"\n  [VERIFY] Check how Compass handled this unknown source:")
-            print(f"    - StudyInstanceUID: {test_study_uid}")
-            print(f"    - Was it routed to a default destination?")
-            print(f"    - Was it flagged for review?")
-            print(f"    - Was it processed differently than known sources?")
-        else:
-            print(f"  Status: REJECTED")
-            print(f"  Compass rejected unknown calling AET '{unknown_aet}'")
-            print(f"  This may be expected behavior for security reasons")
-            print(f"  Error rate: {metrics.error_rate:.1%}")
-            print(f"  Failures: {metrics.failures}")
-        
-        # Document the behavior, but don't fail test
-        print(f"\n[DOCUMENTED BEHAVIOR]")
-        behavior = 'ACCEPTED' if metrics.successes == 1 else 'REJECTED'
-        print(f"  Unknown calling AET '{unknown_aet}' was {behavior} by Compass")
-        print(f"  This documents current Compass configuration for unknown sources")
-        
-    finally:
-        dicom_sender.endpoint.local_ae_title = original_aet
+    print(f"\n[SENDING]")
+    dicom_sender._send_single_dataset(ds, metrics, calling_aet=unknown_aet)
+    run_log.append({
+        'test': 'unknown_calling_aet',
+        'aet': unknown_aet,
+        'status': 'ACCEPTED' if metrics.successes == 1 else 'REJECTED',
+        'latency_ms': metrics.avg_latency_ms,
+        'study_uid': test_study_uid,
+    })
+    
+    print(f"\n[RESULT]")
+    if metrics.successes == 1:
+        print(f"  Status: ACCEPTED")
+        print(f"  Compass accepted unknown calling AET '{unknown_aet}'")
+        print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
+        print(f"\n  [VERIFY] Check how Compass handled this unknown source:")
+        print(f"    - StudyInstanceUID: {test_study_uid}")
+        print(f"    - Was it routed to a default destination?")
+        print(f"    - Was it flagged for review?")
+        print(f"    - Was it processed differently than known sources?")
+    else:
+        print(f"  Status: REJECTED")
+        print(f"  Compass rejected unknown calling AET '{unknown_aet}'")
+        print(f"  This may be expected behavior for security reasons")
+        print(f"  Error rate: {metrics.error_rate:.1%}")
+        print(f"  Failures: {metrics.failures}")
+    
+    # Document the behavior, but don't fail test
+    print(f"\n[DOCUMENTED BEHAVIOR]")
+    behavior = 'ACCEPTED' if metrics.successes == 1 else 'REJECTED'
+    print(f"  Unknown calling AET '{unknown_aet}' was {behavior} by Compass")
+    print(f"  This documents current Compass configuration for unknown sources")
 
 
 # ============================================================================
@@ -378,6 +384,8 @@ def test_unknown_calling_aet(
 def test_calling_aet_with_modality_combinations(
     dicom_by_modality: dict,
     dicom_sender,
+    compass_reachable,
+    run_log: list,
     modality: str
 ):
     """
@@ -395,50 +403,83 @@ def test_calling_aet_with_modality_combinations(
     print(f"TEST: All Calling AETs with Modality {modality}")
     print(f"{'='*70}")
     
-    results = []
-    original_aet = dicom_sender.endpoint.local_ae_title
+    # Parse the reference file once; each AET sends its own copy
+    base_ds = load_dataset(files[0])
     
-    try:
-        for test_case in CALLING_AET_TEST_CASES:
-            calling_aet = test_case['aet']
-            metrics = PerfMetrics()
-            
-            # Load and modify file
-            ds = load_dataset(files[0])
-            ds.Modality = modality  # Ensure modality is set
-            ds.StudyInstanceUID = generate_uid()
-            ds.SeriesInstanceUID = generate_uid()
-            ds.SOPInstanceUID = generate_uid()
-            
-            # Set calling AET
-            dicom_sender.endpoint.local_ae_title = calling_aet
-            
-            # Send
-            dicom_sender._send_single_dataset(ds, metrics)
-            
-            # Track results
-            result = {
-                'aet': calling_aet,
-                'modality': modality,
-                'study_uid': ds.StudyInstanceUID,
-                'success': metrics.successes == 1,
-                'latency': metrics.avg_latency_ms
-            }
-            results.append(result)
-            
-            status = 'OK  ' if result['success'] else 'FAIL'
-            print(f"  {calling_aet:20} + {modality:3} -> {status} ({result['latency']:.0f}ms)")
+    def _send_one(test_case: AETCase) -> dict:
+        calling_aet = test_case.aet
+        metrics = PerfMetrics()
         
-        # Summary
-        successful = sum(1 for r in results if r['success'])
-        print(f"\n  Results: {successful}/{len(results)} succeeded for modality {modality}")
+        # Copy the reference dataset with this send's modality and UIDs
+        ds = _copy_with_values(
+            base_ds,
+            Modality=modality,  # Ensure modality is set
+            StudyInstanceUID=generate_uid(),
+            SeriesInstanceUID=generate_uid(),
+            SOPInstanceUID=generate_uid(),
+        )
         
-        # Verify all succeeded
-        assert all(r['success'] for r in results), \
-            f"Some AET+Modality combinations failed for {modality}"
+        # Send from this calling AET (own association, so sends can overlap)
+        dicom_sender._send_single_dataset(ds, metrics, calling_aet=calling_aet)
         
+        return {
+            'aet': calling_aet,
+            'modality': modality,
+            'study_uid': ds.StudyInstanceUID,
+            'success': metrics.successes == 1,
+            # Failed sends have no average latency, so use the sample itself
+            'latency': metrics.last_sample.latency_ms
+        }
+    
+    attempted = 0
+    successful = 0
+    failed = []
+    
+    def _record(result: dict) -> None:
+        nonlocal attempted, successful
+        attempted += 1
+        status = 'OK' if result['success'] else 'FAIL'
+        run_log.append({
+            'test': 'calling_aet_with_modality',
+            'aet': result['aet'],
+            'modality': modality,
+            'status': status,
+            'latency_ms': result['latency'],
+            'study_uid': result['study_uid'],
+        })
+        if VERBOSE:
+            print(f"  {result['aet']:20} + {modality:3} -> {status:4} ({result['latency']:.0f}ms)")
+        
+        if result['success']:
+            successful += 1
+        else:
+            failed.append(result['aet'])
+    
+    # Send from every AET at once. With FAIL_FAST the sends run one at a
+    # time instead, so the ones after a failure are still queued and can
+    # be dropped. Results are taken in test case order.
+    executor = ThreadPoolExecutor(max_workers=1 if FAIL_FAST else len(CALLING_AET_TEST_CASES))
+    futures = [executor.submit(_send_one, test_case) for test_case in CALLING_AET_TEST_CASES]
+    try:
+        for future in futures:
+            _record(future.result())
+            if failed and FAIL_FAST:
+                break
     finally:
-        dicom_sender.endpoint.local_ae_title = original_aet
+        # On a fail-fast break, drop the sends that haven't started yet
+        executor.shutdown(cancel_futures=FAIL_FAST)
+    
+    # A send already under way when the run stopped still reached Compass,
+    # so it is logged and counted too
+    for future in futures[attempted:]:
+        if not future.cancelled():
+            _record(future.result())
+    
+    # Summary
+    print(f"\n  Results: {successful}/{attempted} succeeded for modality {modality}")
+    
+    # Verify all succeeded, naming the AETs that didn't
+    assert not failed, f"Calling AETs {failed} failed for modality {modality}"
 
 
 # ============================================================================
@@ -449,12 +490,11 @@ def add_calling_aet_template():
     """
     Template for adding new calling AE Titles.
     
-    Copy this structure and add to CALLING_AET_TEST_CASES list:
+    Copy this structure and add to CALLING_AET_TEST_CASES:
     """
-    new_calling_aet = {
-        'name': 'DEVICE_NAME',  # Short identifier (no spaces)
-        'description': 'Human-readable description of the device/system',
-        'aet': 'ACTUAL_AE_TITLE',  # The actual AE Title string
-    }
+    new_calling_aet = AETCase(
+        name='DEVICE_NAME',  # Short identifier (no spaces)
+        description='Human-readable description of the device/system',
+        aet='ACTUAL_AE_TITLE',  # The actual AE Title string
+    )
     return new_calling_aet
-
@@ -19,7 +19,6 @@ import time
 from pathlib import Path
 
 import pytest
-from pydicom import dcmread
 from pydicom.uid import generate_uid
 
 from data_loader import load_dataset
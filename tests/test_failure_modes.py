@@ -129,48 +129,40 @@ def test_mcie_slow_send_one_at_a_time(
     print(f"MCIE SLOW SEND TEST: {len(test_files)} files")
     print(f"{'='*70}")
     
-    # Override to MCIE AET
-    original_aet = dicom_sender.endpoint.local_ae_title
-    dicom_sender.endpoint.local_ae_title = 'MCIE_TEST_SLOW'
+    study_uid = generate_uid()  # Same study for all images
     
-    try:
-        study_uid = generate_uid()  # Same study for all images
-        
-        for i, file in enumerate(test_files, 1):
-            ds = load_dataset(file)
-            
-            # Same study, different series/SOP for each file
-            ds.StudyInstanceUID = study_uid
-            ds.SeriesInstanceUID = generate_uid()
-            ds.SOPInstanceUID = generate_uid()
-            
-            print(f"\n[{i}/{len(test_files)}] Sending image {i} of study")
-            print(f"  File: {file.name}")
-            
-            dicom_sender._send_single_dataset(ds, metrics)
-            
-            if i < len(test_files):
-                print(f"  Waiting {delay_seconds}s before next image...")
-                time.sleep(delay_seconds)
+    for i, file in enumerate(test_files, 1):
+        ds = load_dataset(file)
         
-        print(f"\n{'='*70}")
-        print(f"RESULTS")
-        print(f"{'='*70}")
-        print(f"  StudyInstanceUID: {study_uid}")
-        print(f"  Total images sent: {metrics.successes}")
-        print(f"  Failures: {metrics.failures}")
+        # Same study, different series/SOP for each file
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = generate_uid()
+        ds.SOPInstanceUID = generate_uid()
         
-        assert metrics.successes == len(test_files)
-        assert metrics.error_rate == 0
+        print(f"\n[{i}/{len(test_files)}] Sending image {i} of study")
+        print(f"  File: {file.name}")
         
-        print(f"\n[MANUAL VERIFICATION REQUIRED]")
-        print(f"  1. Check MIDIA for StudyInstanceUID: {study_uid}")
-        print(f"  2. Verify all {len(test_files)} images present")
-        print(f"  3. Check InfinityView for same study")
-        print(f"  4. Verify routing completed despite slow send")
+        dicom_sender._send_single_dataset(ds, metrics, calling_aet='MCIE_TEST_SLOW')
         
-    finally:
-        dicom_sender.endpoint.local_ae_title = original_aet
+        if i < len(test_files):
+            print(f"  Waiting {delay_seconds}s before next image...")
+            time.sleep(delay_seconds)
+    
+    print(f"\n{'='*70}")
+    print(f"RESULTS")
+    print(f"{'='*70}")
+    print(f"  StudyInstanceUID: {study_uid}")
+    print(f"  Total images sent: {metrics.successes}")
+    print(f"  Failures: {metrics.failures}")
+    
+    assert metrics.successes == len(test_files)
+    assert metrics.error_rate == 0
+    
+    print(f"\n[MANUAL VERIFICATION REQUIRED]")
+    print(f"  1. Check MIDIA for StudyInstanceUID: {study_uid}")
+    print(f"  2. Verify all {len(test_files)} images present")
+    print(f"  3. Check InfinityView for same study")
+    print(f"  4. Verify routing completed despite slow send")
 
 
 # ============================================================================
@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+
+"""
+Offline tests for the latency histogram behind the p95 assertions in
+metrics.py. They don't need Compass.
+"""
+
+import random
+
+import pytest
+
+from metrics import LatencyHistogram, PerfMetrics, Sample
+
+
+def _metrics_with(latencies_ms):
+    """PerfMetrics with one successful sample per latency."""
+    metrics = PerfMetrics()
+    for latency_ms in latencies_ms:
+        metrics.record(Sample(start_time=0.0, end_time=latency_ms / 1000.0, success=True))
+    return metrics
+
+
+@pytest.mark.parametrize("percentile", [50, 95])
+def test_percentile_within_one_percent(percentile):
+    """p50/p95 are within 1 percent of the exact value from the sorted latencies."""
+    rng = random.Random(1234)
+    latencies = [rng.lognormvariate(3.0, 1.0) for _ in range(10000)]
+    metrics = _metrics_with(latencies)
+    # Failed sends are not part of the latency distribution
+    metrics.record(Sample(start_time=0.0, end_time=100.0, success=False))
+
+    exact = sorted(latencies)[int(len(latencies) * percentile / 100.0) - 1]
+    assert metrics.latency_percentile_ms(percentile) == pytest.approx(exact, rel=0.01)
+
+
+def test_empty_histogram_has_no_percentile():
+    assert LatencyHistogram().value_at_rank(1) is None
+    assert PerfMetrics().p95_latency_ms is None
+
+
+def test_all_zero_latencies():
+    """Values at or below min_value_ms share bucket 0, capped at the largest value (0)."""
+    histogram = LatencyHistogram()
+    for _ in range(10):
+        histogram.record(0.0)
+    histogram.record(histogram.min_value_ms)
+    assert histogram._counts == {0: 11}
+    assert _metrics_with([0.0] * 10).p95_latency_ms == 0.0
+
+
+def test_rank_is_clamped_and_capped_at_max():
+    histogram = LatencyHistogram()
+    for value_ms in (1.0, 2.0, 5.0):
+        histogram.record(value_ms)
+    # Ranks outside 1..count give the smallest and largest values
+    assert histogram.value_at_rank(0) == pytest.approx(1.0, rel=0.01)
+    assert histogram.value_at_rank(100) == 5.0
+    # The top bucket's upper bound is capped at the largest value recorded
+    assert histogram.value_at_rank(3) == 5.0
+    assert _metrics_with([5.0]).latency_percentile_ms(100) == 5.0
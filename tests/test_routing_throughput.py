@@ -11,85 +11,229 @@ These focus on:
 
 from __future__ import annotations
 
+import copy
+import functools
+import gc
 import itertools
-import tempfile
-import shutil
-from datetime import datetime
-from typing import Tuple
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Sequence, Tuple
 
 import pytest
-from pydicom import dcmread
-from pydicom.uid import generate_uid
+from pydicom import config
+from pydicom.dataelem import DataElement
+from pydicom.tag import Tag
 
 from metrics import PerfMetrics
 
 
+# Pre-generated UIDs handed out by _next_uid(), refilled in batches
+_UID_POOL: Deque[str] = deque()
+
+
+def _refill_uid_pool(n: int = 4096) -> None:
+    """
+    Add n UUID-derived ("2.25." prefix) UIDs to the pool.
+    
+    Same UID form as pydicom's generate_uid() default, but the randomness for
+    the whole batch comes from a single secrets.token_bytes() call.
+    """
+    entropy = secrets.token_bytes(16 * n)
+    _UID_POOL.extend(
+        f"2.25.{int.from_bytes(entropy[i:i + 16], 'big')}"
+        for i in range(0, len(entropy), 16)
+    )
+
+
+def _next_uid() -> str:
+    """Return a fresh unique UID from the pool."""
+    if len(_UID_POOL) < 16:
+        _refill_uid_pool()
+    return _UID_POOL.popleft()
+
+
+# Sequence number appended to accession numbers; shared by all producer threads
+_ACCESSION_COUNTER = itertools.count()
+_ACCESSION_LOCK = threading.Lock()
+
+
 def generate_accession_number() -> str:
-    """Generate a unique accession number based on current timestamp."""
-    now = datetime.now()
-    microseconds = now.microsecond
-    return f"{now.strftime('%Y%m%d-%H%M%S')}-{microseconds:06d}"
+    """
+    Generate a unique accession number based on current timestamp.
+    
+    YYMMDDHHMMSS plus a 4-digit sequence number: 16 characters, the SH
+    maximum. The sequence number comes from a locked counter, so two sends
+    in the same clock tick (even from different threads) never collide.
+    """
+    with _ACCESSION_LOCK:
+        sequence = next(_ACCESSION_COUNTER) % 10_000
+    return f"{_accession_timestamp(int(time.time()))}{sequence:04d}"
 
 
-def update_tag_recursively(ds, tag_tuple: Tuple, value, vr: str = None) -> int:
-    """Recursively update a tag in the dataset and all nested sequences."""
-    count = 0
+@functools.lru_cache(maxsize=1)
+def _accession_timestamp(seconds: int) -> str:
+    """Format the YYMMDDHHMMSS part of an accession number (cached per second)."""
+    return time.strftime('%y%m%d%H%M%S', time.localtime(seconds))
+
+
+def update_tags_recursively(ds, updates: Dict[Tag, object]) -> int:
+    """
+    Update several tags in the dataset and all nested sequences in one walk.
     
-    if tag_tuple in ds:
-        ds[tag_tuple].value = value
-        count += 1
+    Args:
+        ds: pydicom Dataset object
+        updates: Mapping of Tag to the new value for that tag
+        
+    Returns:
+        Count of how many elements were updated
+    """
+    count = 0
     
-    for elem in ds:
-        if elem.VR == "SQ" and elem.value:
-            for seq_item in elem.value:
-                count += update_tag_recursively(seq_item, tag_tuple, value, vr)
+    # Walk the element map directly: iterating the Dataset would sort it and
+    # convert every raw element, when only the updated elements and the
+    # sequences need converting. Raw elements read from implicit VR files
+    # have no VR yet, so those are converted to find the sequences.
+    for tag, elem in ds._dict.items():
+        if tag in updates:
+            ds[tag].value = updates[tag]
+            count += 1
+        elif elem.VR in ("SQ", None):
+            elem = ds[tag]
+            if elem.VR == "SQ" and elem.value:
+                for seq_item in elem.value:
+                    count += update_tags_recursively(seq_item, updates)
     
     return count
 
 
+# Tags rewritten for every variant, with the VR used when the tag is added
+VARIANT_TAGS = (
+    (Tag(0x0020, 0x000d), 'UI'),  # StudyInstanceUID
+    (Tag(0x0008, 0x0050), 'SH'),  # AccessionNumber
+    (Tag(0x0020, 0x000e), 'UI'),  # SeriesInstanceUID
+    (Tag(0x0008, 0x0018), 'UI'),  # SOPInstanceUID
+)
+
+# For each source dataset, the top-level sequences that contain any of the
+# VARIANT_TAGS, keyed by filename (or id() for in-memory datasets). Computed
+# once per source; empty for typical images, where the UIDs only appear at
+# the top level.
+_NESTED_UID_CACHE: Dict[object, Tuple[Tag, ...]] = {}
+
+
+def _sequences_with_tags(ds, tags) -> Tuple[Tag, ...]:
+    """Return the top-level sequence tags whose items contain any of the given tags."""
+    sequences = []
+    # As in update_tags_recursively, only sequences (and raw implicit VR
+    # elements, whose VR isn't known yet) are converted from the raw form
+    for tag, elem in ds._dict.items():
+        if elem.VR not in ("SQ", None):
+            continue
+        elem = ds[tag]
+        if elem.VR == "SQ" and elem.value and any(
+            nested.tag in tags for seq_item in elem.value for nested in seq_item.iterall()
+        ):
+            sequences.append(tag)
+    return tuple(sequences)
+
+
 def create_anonymized_variant(ds):
     """
     Create an anonymized copy of a dataset with unique UIDs.
     Returns a new dataset object (doesn't modify original).
+    
+    The source dataset is already parsed, so it is copied in memory rather
+    than re-read from disk. The copy only gets its own element map and the
+    four UID elements are replaced; everything else (pixel data included)
+    is shared with the source. Sequences that contain one of the UID tags
+    are the exception: those are deep-copied and updated in place. Typical
+    images have none, so no sequence is walked at all.
     """
-    # Create a deep copy by re-reading if possible, otherwise use as-is
-    if hasattr(ds, 'filename') and ds.filename:
-        ds_copy = dcmread(ds.filename)
-    else:
-        # If no filename, work with the dataset directly (it's already loaded)
-        # We'll need to work with it as-is since we can't deep copy easily
-        ds_copy = ds
+    key = getattr(ds, 'filename', None) or id(ds)
+    nested_sequences = _NESTED_UID_CACHE.get(key)
+    if nested_sequences is None:
+        nested_sequences = _NESTED_UID_CACHE[key] = _sequences_with_tags(
+            ds, {tag for tag, _ in VARIANT_TAGS}
+        )
+    
+    ds_copy = copy.copy(ds)
+    # A shallow copy shares the element map; give the copy its own
+    ds_copy._dict = dict(ds._dict)
     
     # Generate new unique identifiers
-    new_study_uid = generate_uid()
-    new_accession_number = generate_accession_number()
-    new_series_uid = generate_uid()
-    new_sop_instance_uid = generate_uid()
+    new_values = (
+        _next_uid(),                   # StudyInstanceUID
+        generate_accession_number(),   # AccessionNumber
+        _next_uid(),                   # SeriesInstanceUID
+        _next_uid(),                   # SOPInstanceUID
+    )
     
-    # Update UIDs
-    if (0x0020, 0x000d) not in ds_copy:
-        ds_copy.add_new((0x0020, 0x000d), 'UI', new_study_uid)
-    update_tag_recursively(ds_copy, (0x0020, 0x000d), new_study_uid, 'UI')
+    # Store fresh elements straight into the copy's element map, so the
+    # source's elements are never modified. This skips Dataset.__setitem__
+    # and value validation, which dominate the per-send cost; the values
+    # are generated here and known to be well-formed (valid UIDs and a
+    # 16-character accession number).
+    elements = ds_copy._dict
+    for (tag, vr), value in zip(VARIANT_TAGS, new_values):
+        elements[tag] = DataElement(tag, vr, value, validation_mode=config.IGNORE)
     
-    if (0x0008, 0x0050) not in ds_copy:
-        ds_copy.add_new((0x0008, 0x0050), 'SH', new_accession_number)
-    update_tag_recursively(ds_copy, (0x0008, 0x0050), new_accession_number, 'SH')
+    if nested_sequences:
+        updates = {tag: value for (tag, _), value in zip(VARIANT_TAGS, new_values)}
+        for sq_tag in nested_sequences:
+            sequence = elements[sq_tag] = copy.deepcopy(ds._dict[sq_tag])
+            for seq_item in sequence.value:
+                update_tags_recursively(seq_item, updates)
     
-    if (0x0020, 0x000e) not in ds_copy:
-        ds_copy.add_new((0x0020, 0x000e), 'UI', new_series_uid)
-    update_tag_recursively(ds_copy, (0x0020, 0x000e), new_series_uid, 'UI')
+    return ds_copy
+
+
+def _produce_variants(
+    datasets: Sequence,
+    out_queue: queue.Queue,
+    stop_event: threading.Event,
+    errors: List[BaseException],
+) -> None:
+    """
+    Background producer: keep out_queue filled with anonymized variants.
     
-    if (0x0008, 0x0018) not in ds_copy:
-        ds_copy.add_new((0x0008, 0x0018), 'UI', new_sop_instance_uid)
-    update_tag_recursively(ds_copy, (0x0008, 0x0018), new_sop_instance_uid, 'UI')
+    Runs until stop_event is set, so anonymization overlaps with the
+    C-STORE workers instead of running between sends. Sources are taken
+    round-robin by index rather than through itertools.cycle, which would
+    keep its own copy of everything it has iterated.
     
-    return ds_copy
+    If a variant can't be created, the error is appended to errors and None
+    is queued: that ends the consumer's iterator, rather than leaving it
+    waiting forever for a producer that has died.
+    """
+    count = len(datasets)
+    index = 0
+    while True:
+        try:
+            variant = create_anonymized_variant(datasets[index % count])
+        except Exception as e:
+            errors.append(e)
+            variant = None
+        index += 1
+        while True:
+            if stop_event.is_set():
+                return
+            try:
+                out_queue.put(variant, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        if variant is None:
+            return
 
 
 @pytest.mark.load
 @pytest.mark.parametrize("multiplier", [1.5, 2.0])
 def test_routing_throughput_under_peak_plus(
     dicom_sender,
+    compass_reachable,
     dicom_datasets,
     metrics: PerfMetrics,
     perf_config,
@@ -99,28 +243,49 @@ def test_routing_throughput_under_peak_plus(
     Push Compass to 150 percent and 200 percent of configured peak_images_per_second.
     Now with anonymization - each send gets unique UIDs even from a single file.
     """
-    assert dicom_sender.ping(), "Compass did not respond to C-ECHO ping"
-
     target_peak = perf_config.load_profile.peak_images_per_second * multiplier
     duration = perf_config.load_profile.test_duration_seconds
 
-    # Create anonymized variants generator
-    # This will continuously create new anonymized copies with unique UIDs
-    def anonymized_dataset_generator():
-        for ds in itertools.cycle(dicom_datasets):
-            yield create_anonymized_variant(ds)
+    concurrency = perf_config.load_profile.concurrency
+
+    # A background thread continuously creates anonymized copies with unique
+    # UIDs; the bounded queue keeps the senders fed without unbounded memory
+    variant_queue: queue.Queue = queue.Queue(maxsize=2 * concurrency)
+    stop_producer = threading.Event()
+    producer_errors: List[BaseException] = []
+    producer = threading.Thread(
+        target=_produce_variants,
+        args=(dicom_datasets, variant_queue, stop_producer, producer_errors),
+        daemon=True,
+    )
     
     print(f"\n[INFO] Starting throughput test with {multiplier}x multiplier")
     print(f"[INFO] Each file will be anonymized with unique UIDs before sending")
     print(f"[INFO] Source files: {len(dicom_datasets)}")
     
-    total_sent = dicom_sender.load_test_for_duration(
-        datasets=anonymized_dataset_generator(),
-        metrics=metrics,
-        duration_seconds=duration,
-        concurrency=perf_config.load_profile.concurrency,
-        rate_limit_images_per_second=target_peak,
-    )
+    # Collect leftovers from earlier tests, then move everything still alive
+    # (the parsed sources included) to the permanent generation so the
+    # collector doesn't re-scan it during the timed window
+    gc.collect()
+    gc.freeze()
+    
+    producer.start()
+    try:
+        total_sent = dicom_sender.load_test_for_duration(
+            # The producer only puts None if it fails, which ends the run
+            datasets=iter(variant_queue.get, None),
+            metrics=metrics,
+            duration_seconds=duration,
+            concurrency=concurrency,
+            rate_limit_images_per_second=target_peak,
+        )
+    finally:
+        stop_producer.set()
+        producer.join()
+        gc.unfreeze()
+    
+    if producer_errors:
+        raise producer_errors[0]
 
     snapshot = metrics.snapshot()
     actual_rate = metrics.throughput_per_second()
@@ -16,8 +16,8 @@ NOTE: These tests send to Compass but do not automatically verify the output.
 
 from __future__ import annotations
 
-import os
-from datetime import datetime
+import functools
+import sys
 
 import pytest
 
@@ -25,6 +25,12 @@ from data_loader import load_dataset
 from metrics import PerfMetrics
 
 
+@functools.lru_cache(maxsize=None)
+def _snake_to_camel(name: str) -> str:
+    """Convert a snake_case attribute name to its DICOM keyword (PascalCase)."""
+    return ''.join(word.capitalize() for word in name.split('_'))
+
+
 # ============================================================================
 # Test Case Definitions
 # ============================================================================
@@ -72,6 +78,7 @@ def test_routing_transformation(
     test_case: dict,
     test_dicom_with_attributes,
     dicom_sender,
+    run_log: list,
     metrics: PerfMetrics
 ):
     """
@@ -99,21 +106,19 @@ def test_routing_transformation(
     print(f"{'='*70}")
     print(f"Description: {test_desc}")
     
-    # Create test file with input attributes
-    test_file_path, test_dataset = test_dicom_with_attributes(**test_case['input'])
-    
-    try:
+    # Create test file with input attributes (removed when the block exits)
+    with test_dicom_with_attributes(**test_case['input']) as (test_file_path, test_dataset):
         # Display test configuration
         print(f"\n[CONFIGURATION]")
         print(f"  Source AE Title: {test_case['aet']}")
         print(f"\n[INPUT ATTRIBUTES]")
         for attr_name, attr_value in test_case['input'].items():
-            display_name = ''.join(word.capitalize() for word in attr_name.split('_'))
+            display_name = _snake_to_camel(attr_name)
             print(f"  {display_name}: {attr_value}")
         
         print(f"\n[EXPECTED TRANSFORMATIONS]")
         for attr_name, attr_value in test_case['expected'].items():
-            display_name = ''.join(word.capitalize() for word in attr_name.split('_'))
+            display_name = _snake_to_camel(attr_name)
             print(f"  {display_name}: '{attr_value}'")
         
         print(f"\n[TEST IDENTIFIERS]")
@@ -121,49 +126,44 @@ def test_routing_transformation(
         print(f"  SeriesInstanceUID: {test_dataset.SeriesInstanceUID}")
         print(f"  SOPInstanceUID: {test_dataset.SOPInstanceUID}")
         
-        # Override AE title for this test
-        original_ae_title = dicom_sender.endpoint.local_ae_title
-        dicom_sender.endpoint.local_ae_title = test_case['aet']
+        # Send to Compass
+        print(f"\n[STEP 1: SENDING TO COMPASS]")
+        print(f"  Compass Host: {dicom_sender.endpoint.host}")
+        print(f"  Compass Port: {dicom_sender.endpoint.port}")
         
-        try:
-            # Send to Compass
-            print(f"\n[STEP 1: SENDING TO COMPASS]")
-            print(f"  Compass Host: {dicom_sender.endpoint.host}")
-            print(f"  Compass Port: {dicom_sender.endpoint.port}")
-            
-            ds = load_dataset(test_file_path)
-            dicom_sender._send_single_dataset(ds, metrics)
-            
-            # Verify send was successful
-            assert metrics.successes == 1, \
-                f"Send failed: {metrics.failures} failures, error rate: {metrics.error_rate:.1%}"
-            
-            print(f"  Status: SUCCESS")
-            print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
-            
-            # Manual verification instructions
-            print(f"\n[STEP 2: VERIFICATION]")
-            print(f"  Manual verification required:")
-            print(f"  1. Query Compass for StudyInstanceUID: {test_dataset.StudyInstanceUID}")
-            print(f"  2. Verify the following transformations were applied:")
-            for attr_name, expected_value in test_case['expected'].items():
-                display_name = ''.join(word.capitalize() for word in attr_name.split('_'))
-                print(f"     - {display_name} = '{expected_value}'")
-            
-            # TODO: Automated verification via C-FIND
-            # Uncomment if C-FIND query support is available:
-            # query_and_verify(dicom_sender, test_dataset.StudyInstanceUID, test_case['expected'])
-            
-            print(f"\n[RESULT: SEND SUCCESSFUL - MANUAL VERIFICATION PENDING]")
-            
-        finally:
-            # Restore original AE title
-            dicom_sender.endpoint.local_ae_title = original_ae_title
-    
-    finally:
-        # Cleanup temp file
-        if os.path.exists(test_file_path):
-            os.remove(test_file_path)
+        ds = load_dataset(test_file_path)
+        dicom_sender._send_single_dataset(ds, metrics, calling_aet=test_case['aet'])
+        run_log.append({
+            'test': 'routing_transformation',
+            'case': test_name,
+            'aet': test_case['aet'],
+            'status': 'OK' if metrics.successes == 1 else 'FAIL',
+            'latency_ms': metrics.avg_latency_ms,
+            'study_uid': test_dataset.StudyInstanceUID,
+            'expected': test_case['expected'],
+        })
+        
+        # Verify send was successful
+        assert metrics.successes == 1, \
+            f"Send failed: {metrics.failures} failures, error rate: {metrics.error_rate:.1%}"
+        
+        print(f"  Status: SUCCESS")
+        print(f"  Latency: {metrics.avg_latency_ms:.2f}ms")
+        
+        # Manual verification instructions
+        print(f"\n[STEP 2: VERIFICATION]")
+        print(f"  Manual verification required:")
+        print(f"  1. Query Compass for StudyInstanceUID: {test_dataset.StudyInstanceUID}")
+        print(f"  2. Verify the following transformations were applied:")
+        for attr_name, expected_value in test_case['expected'].items():
+            display_name = _snake_to_camel(attr_name)
+            print(f"     - {display_name} = '{expected_value}'")
+        
+        # TODO: Automated verification via C-FIND
+        # Uncomment if C-FIND query support is available:
+        # query_and_verify(dicom_sender, test_dataset.StudyInstanceUID, test_case['expected'])
+        
+        print(f"\n[RESULT: SEND SUCCESSFUL - MANUAL VERIFICATION PENDING]")
 
 
 # ============================================================================
@@ -205,7 +205,7 @@ def query_and_verify(dicom_sender, study_uid: str, expected_attributes: dict):
     #         if status and identifier:
     #             # Verify each expected attribute
     #             for attr_name, expected_value in expected_attributes.items():
-    #                 dicom_attr = ''.join(word.capitalize() for word in attr_name.split('_'))
+    #                 dicom_attr = _snake_to_camel(attr_name)
     #                 actual_value = getattr(identifier, dicom_attr, None)
     #                 assert actual_value == expected_value, \
     #                     f"{dicom_attr} mismatch: expected '{expected_value}', got '{actual_value}'"
@@ -231,25 +231,31 @@ def test_all_transformations_summary(
     This test doesn't send anything - it just documents what will be tested.
     Run this first to see what transformation rules are being validated.
     """
-    print(f"\n{'='*70}")
-    print(f"COMPASS ROUTING TRANSFORMATION TEST SUITE")
-    print(f"{'='*70}")
-    print(f"\nTotal test cases configured: {len(TRANSFORMATION_TEST_CASES)}")
-    print(f"\nTest cases:")
+    # Build the whole report and write it once
+    parts = [
+        f"\n{'='*70}\n",
+        "COMPASS ROUTING TRANSFORMATION TEST SUITE\n",
+        f"{'='*70}\n",
+        f"\nTotal test cases configured: {len(TRANSFORMATION_TEST_CASES)}\n",
+        "\nTest cases:\n",
+    ]
     
     for i, test_case in enumerate(TRANSFORMATION_TEST_CASES, 1):
-        print(f"\n{i}. {test_case['name']}")
-        print(f"   Description: {test_case['description']}")
-        print(f"   AE Title: {test_case['aet']}")
-        print(f"   Input: {', '.join(f'{k}={v}' for k, v in test_case['input'].items())}")
-        print(f"   Expected: {', '.join(f'{k}={v}' for k, v in test_case['expected'].items())}")
+        parts.append(f"\n{i}. {test_case['name']}\n")
+        parts.append(f"   Description: {test_case['description']}\n")
+        parts.append(f"   AE Title: {test_case['aet']}\n")
+        parts.append(f"   Input: {', '.join(f'{k}={v}' for k, v in test_case['input'].items())}\n")
+        parts.append(f"   Expected: {', '.join(f'{k}={v}' for k, v in test_case['expected'].items())}\n")
     
-    print(f"\n{'='*70}")
-    print(f"To run all transformation tests:")
-    print(f"  pytest tests/test_routing_transformations.py::test_routing_transformation -v")
-    print(f"\nTo run a specific test case:")
-    print(f"  pytest tests/test_routing_transformations.py::test_routing_transformation[OPV_GPA_VisualFields] -v")
-    print(f"{'='*70}\n")
+    parts += [
+        f"\n{'='*70}\n",
+        "To run all transformation tests:\n",
+        "  pytest tests/test_routing_transformations.py::test_routing_transformation -v\n",
+        "\nTo run a specific test case:\n",
+        "  pytest tests/test_routing_transformations.py::test_routing_transformation[OPV_GPA_VisualFields] -v\n",
+        f"{'='*70}\n\n",
+    ]
+    sys.stdout.write("".join(parts))
 
 
 # ============================================================================
@@ -0,0 +1,201 @@
+# tests/test_update_dicom_tags.py
+
+"""
+Offline tests for update_dicom_tags.py
+
+These run against copies of pydicom's bundled sample files and don't
+need Compass.
+"""
+
+import os
+import shutil
+
+import pytest
+from pydicom import dcmread
+from pydicom.data import get_testdata_file
+from pydicom.uid import PYDICOM_ROOT_UID
+
+from update_dicom_tags import (
+    STUDY_INSTANCE_UID_TAG,
+    generate_accession_number,
+    generate_unique_uid,
+    is_valid_uid,
+    plan_patches,
+    process_folder,
+    update_dicom_file,
+)
+
+
+def _pixel_data(path):
+    """Raw PixelData bytes of a file."""
+    return dcmread(path)._dict[0x7FE00010].value
+
+
+# ============================================================================
+# UIDs sized to fit existing values
+# ============================================================================
+
+def test_fitted_uid_has_exact_length():
+    """A UID generated for an existing value fills it exactly and stays valid."""
+    for length in (42, 44, 56, 64):
+        uid = generate_unique_uid(length)
+        assert len(uid) == length
+        assert is_valid_uid(uid)
+        # The random component never starts with a 0
+        assert uid[len(PYDICOM_ROOT_UID)] != '0'
+
+
+def test_uid_patch_uses_at_most_one_null():
+    """A UID is only patched in place if it needs no more than one NULL of padding."""
+    ds = dcmread(get_testdata_file('CT_small.dcm'), stop_before_pixels=True)
+    elem = ds._dict[STUDY_INSTANCE_UID_TAG]
+    raw_elements = {STUDY_INSTANCE_UID_TAG: elem}
+
+    def patch(uid):
+        return plan_patches(raw_elements, (('StudyInstanceUID', (STUDY_INSTANCE_UID_TAG,), 'UI', uid),))
+
+    patches = patch(generate_unique_uid(elem.length))
+    assert patches is not None
+    (offset, data), = patches
+    assert offset == elem.value_tell
+    assert len(data) == elem.length
+    assert data.count(b'\0') <= 1
+
+    # Too short: would need several NULLs of padding
+    assert patch(f"{PYDICOM_ROOT_UID}{'1' * 16}") is None
+
+
+# ============================================================================
+# --fast-patch
+# ============================================================================
+
+def test_accession_number_fits_sh():
+    """Accession numbers fit in an SH value (16 characters)."""
+    assert all(len(generate_accession_number()) <= 16 for _ in range(100))
+
+
+@pytest.mark.parametrize("name", ["CT_small.dcm", "MR_small.dcm"])
+def test_fast_patch_updates_in_place(tmp_path, name):
+    """A file whose values are long enough is patched in place, not re-written."""
+    path = str(tmp_path / name)
+    ds = dcmread(get_testdata_file(name))
+    # Values as long as a scanner might write (the samples leave some empty),
+    # with the Accession Number at the SH maximum
+    ds.AccessionNumber = 'ACC0000000000001'
+    ds.PatientID = 'PATIENT-0001'
+    ds.PatientName = 'SAMPLE^PATIENT^WITH^LONG^NAME'
+    ds.PatientBirthDate = '19700101'
+    ds.InstitutionName = 'GENERAL HOSPITAL IMAGING'
+    ds.ReferringPhysicianName = 'REFERRING^PHYSICIAN'
+    ds.save_as(path)
+
+    before = dcmread(path)
+    size = os.path.getsize(path)
+    inode = os.stat(path).st_ino
+    pixel_data = _pixel_data(path)
+
+    success, _, verify_success, _, messages = update_dicom_file(path, verbose=True, fast_patch=True)
+    assert success and verify_success
+    assert "  Step 3: Patching tag values in place..." in messages
+
+    after = dcmread(path)
+    assert os.path.getsize(path) == size
+    assert os.stat(path).st_ino == inode
+    assert _pixel_data(path) == pixel_data
+    for keyword in ("StudyInstanceUID", "SeriesInstanceUID", "AccessionNumber"):
+        assert after[keyword].value != before[keyword].value
+    assert is_valid_uid(after.StudyInstanceUID)
+    assert is_valid_uid(after.SeriesInstanceUID)
+
+
+def _tail(path):
+    """Bytes of a file from its pixel data on."""
+    with open(path, 'rb') as f:
+        dcmread(f, stop_before_pixels=True)
+        return f.read()
+
+
+@pytest.mark.parametrize("name", ["CT_small.dcm", "MR_small_implicit.dcm", "MR_small_bigendian.dcm"])
+def test_fast_patch_rewrites_header_only(tmp_path, name):
+    """Values that don't fit re-write the header and copy the pixel data verbatim."""
+    path = str(tmp_path / name)
+    shutil.copy(get_testdata_file(name), path)
+    tail = _tail(path)
+    pixel_data = _pixel_data(path)
+
+    success, _, verify_success, _, messages = update_dicom_file(path, verbose=True, fast_patch=True)
+    assert success and verify_success
+    assert "    ℹ Values don't fit in place, re-writing the header" in messages
+
+    with open(path, 'rb') as f:
+        assert f.read().endswith(tail)
+    assert _pixel_data(path) == pixel_data
+    assert dcmread(path).PatientID == '11043207'
+
+
+def test_fast_patch_deflated_file_is_rewritten(tmp_path):
+    """A deflated file can't be patched or have its tail copied, so it is re-written in full."""
+    path = str(tmp_path / "image_dfl.dcm")
+    shutil.copy(get_testdata_file("image_dfl.dcm"), path)
+    pixel_data = _pixel_data(path)
+
+    success, _, verify_success, _, messages = update_dicom_file(path, verbose=True, fast_patch=True)
+    assert success and verify_success
+    assert "    ℹ Values don't fit in place, reading the whole file" in messages
+    assert _pixel_data(path) == pixel_data
+
+
+# ============================================================================
+# Folders
+# ============================================================================
+
+def _sample_folder(folder, names):
+    """Copy pydicom sample files into a folder, numbering the copies."""
+    folder.mkdir()
+    for idx, name in enumerate(names):
+        shutil.copy(get_testdata_file(name), folder / f"{idx:02d}_{name}")
+    return str(folder)
+
+
+def test_parallel_run_matches_serial_run(tmp_path, capsys):
+    """--workers 2 updates the same files as a serial run."""
+    names = ["CT_small.dcm", "MR_small.dcm", "MR_small_implicit.dcm", "MR_small_bigendian.dcm"] * 2
+    serial = _sample_folder(tmp_path / "serial", names)
+    parallel = _sample_folder(tmp_path / "parallel", names)
+    # A file that isn't DICOM fails in both runs
+    for folder in (serial, parallel):
+        with open(os.path.join(folder, "broken.dcm"), 'wb') as f:
+            f.write(b"not a DICOM file")
+
+    serial_stats = process_folder(serial)
+    parallel_stats = process_folder(parallel, workers=2)
+    capsys.readouterr()
+
+    assert serial_stats['total'] == 9
+    assert serial_stats['success'] == 8
+    assert serial_stats['failed'] == 1
+    assert parallel_stats == serial_stats
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_keep_series_shares_new_values(tmp_path, capsys, workers):
+    """--keep-series gives copies of one series the same new values, and other series their own."""
+    folder = _sample_folder(tmp_path / "series", ["CT_small.dcm"] * 3 + ["MR_small.dcm"] * 2)
+    stats = process_folder(folder, workers=workers, keep_series=True)
+    capsys.readouterr()
+    assert stats['success'] == 5
+
+    keywords = ("StudyInstanceUID", "SeriesInstanceUID", "AccessionNumber")
+    values = {}
+    for entry in sorted(os.listdir(folder)):
+        ds = dcmread(os.path.join(folder, entry))
+        values.setdefault(entry.split('_', 1)[1], set()).add(tuple(str(ds[keyword].value) for keyword in keywords))
+
+    # One set of new values per original series
+    assert len(values["CT_small.dcm"]) == 1
+    assert len(values["MR_small.dcm"]) == 1
+    (ct,), (mr,) = values["CT_small.dcm"], values["MR_small.dcm"]
+    original = dcmread(get_testdata_file("CT_small.dcm"))
+    assert ct[0] != original.StudyInstanceUID
+    assert ct[1] != original.SeriesInstanceUID
+    assert all(new_ct != new_mr for new_ct, new_mr in zip(ct, mr))